@@ -23,11 +23,15 @@ from . import op_island_align_pie
 from . import op_island_scale
 from . import op_batch_export
 from . import op_bake
+from . import bake
 from . import op_mesh_tools
+from . import smooth_faces
 from . import op_preview_bake
 from . import op_island_relax
 from . import op_island_orient
 from . import panels
+from . import utils_mesh
+from . import utils_bake
 
 # 定义目录历史记录的属性组
 class DirectoryHistoryItem(PropertyGroup):
@@ -47,11 +51,14 @@ def register():
         op_island_scale,
         op_batch_export,
         op_bake,
+        bake,
         op_mesh_tools,
+        smooth_faces,
         op_preview_bake,
         op_island_relax,
         op_island_orient,
-        panels
+        panels,
+        utils_mesh
     )
     
     for mod in modules:
@@ -103,10 +110,18 @@ def register():
         items=[
             ('COMBINED', "组合", "烘焙组合贴图"),
             ('AO', "AO", "烘焙环境光遮蔽"),
-            ('LIGHT', "光照", "烘焙光照贴图")
+            ('LIGHT', "光照", "烘焙光照贴图"),
+            ('SHADOW', "阴影", "烘焙阴影贴图"),
+            ('NORMAL', "法线", "烘焙法线贴图")
         ],
         default='COMBINED'
     )
+    bpy.types.Scene.bake_precision = EnumProperty(
+        name="存储精度",
+        description="烘焙输出图像的存储精度",
+        items=utils_bake.PRECISIONS,
+        default='FLOAT'
+    )
 
 def unregister():
     # 注销所有模块
@@ -119,11 +134,14 @@ def unregister():
         op_island_scale,
         op_batch_export,
         op_bake,
+        bake,
         op_mesh_tools,
+        smooth_faces,
         op_preview_bake,
         op_island_relax,
         op_island_orient,
-        panels
+        panels,
+        utils_mesh
     )
     
     for mod in modules:
@@ -145,6 +163,8 @@ def unregister():
         del bpy.types.Scene.bake_margin
     if hasattr(bpy.types.Scene, 'bake_type'):
         del bpy.types.Scene.bake_type
+    if hasattr(bpy.types.Scene, 'bake_precision'):
+        del bpy.types.Scene.bake_precision
 
 if __name__ == "__main__":
     register()
@@ -1,5 +1,8 @@
 import bpy
 from bpy.types import Operator
+from bpy.props import BoolProperty, IntProperty
+from . import utils_bake
+from . import utils_bake_farm
 
 class OBJECT_OT_bake_textures(Operator):
     """烘焙组合贴图（R:黑色, G:AO, B:光照）"""
@@ -7,179 +10,129 @@ class OBJECT_OT_bake_textures(Operator):
     bl_label = "烘焙贴图"
     bl_options = {'REGISTER', 'UNDO'}
     
-    def setup_material(self, context, obj, bake_image):
-        # 创建或获取材质
-        if not obj.material_slots:
-            mat = bpy.data.materials.new(name=f"{obj.name}_bake_material")
-            mat.use_nodes = True
-            obj.data.materials.append(mat)
-        mat = obj.material_slots[0].material
-        nodes = mat.node_tree.nodes
-        links = mat.node_tree.links
-        
-        # 清理现有节点
-        nodes.clear()
-        
-        # 创建节点
-        output_node = nodes.new('ShaderNodeOutputMaterial')
-        diffuse = nodes.new('ShaderNodeBsdfDiffuse')
-        image_node = nodes.new('ShaderNodeTexImage')
-        
-        # 设置节点位置
-        output_node.location = (300, 0)
-        diffuse.location = (-100, 0)
-        image_node.location = (-300, 0)
-        
-        # 设置节点属性
-        image_node.image = bake_image
-        
-        # 连接节点
-        links.new(diffuse.outputs[0], output_node.inputs['Surface'])
-        
-        # 设置为活动节点
-        image_node.select = True
-        nodes.active = image_node
-        
-        return image_node
+    single_pass: BoolProperty(
+        name="单次烘焙",
+        description="用临时着色器把AO和光照写入各自通道，一次烘焙得到组合贴图",
+        default=True
+    )
+    
+    use_cache: BoolProperty(
+        name="使用缓存",
+        description="输入未变化时直接读取缓存的烘焙结果",
+        default=True
+    )
     
     def execute(self, context):
         obj = context.active_object
-        if obj is None:
-            self.report({'ERROR'}, "请选择一个物体")
-            return {'CANCELLED'}
-        
-        # 检查是否有第二UV图层
-        if len(obj.data.uv_layers) < 2:
-            self.report({'ERROR'}, "物体需要第二UV图层")
+        error = utils_bake.check_object(obj)
+        if error:
+            self.report({'ERROR'}, error)
             return {'CANCELLED'}
         
-        # 存储当前活动的UV图层
-        active_uv = obj.data.uv_layers.active
-        
-        # 设置第二个UV图层为活动图层
-        obj.data.uv_layers.active = obj.data.uv_layers[1]
-        
-        # 获取烘焙设置
-        resolution = int(context.scene.bake_resolution)
-        
-        # 创建光照贴图
-        lighting_image = bpy.data.images.new(
-            name=f"{obj.name}_lighting",
-            width=resolution,
-            height=resolution,
-            alpha=False,
-            float_buffer=True
-        )
-        
-        # 创建AO贴图
-        ao_image = bpy.data.images.new(
-            name=f"{obj.name}_ao",
-            width=resolution,
-            height=resolution,
-            alpha=False,
-            float_buffer=True
-        )
-        
-        # 创建最终的组合贴图
-        final_image = bpy.data.images.new(
-            name=f"{obj.name}_combined",
-            width=resolution,
-            height=resolution,
-            alpha=False,
-            float_buffer=True
+        # 分辨率、采样数和边缘扩展来自面板设置
+        settings = utils_bake.BakeSettings.from_scene(
+            context.scene,
+            bake_type='COMBINED',
+            single_pass=self.single_pass,
+            use_cache=self.use_cache
         )
         
-        # 设置活动的UV图层
-        if not obj.data.uv_layers.active:
-            self.report({'ERROR'}, "物体需要UV展开")
+        # 烘焙前探测可用设备（GPU 或调优过的 CPU）并写入 Cycles 设置
+        _, _, cached = utils_bake.bake_textures(context, settings, [obj])[0]
+        if cached:
+            self.report({'INFO'}, "已从缓存读取组合贴图")
+        else:
+            self.report({'INFO'}, f"已完成组合贴图烘焙（{settings.device.summary()}；{settings.report_timings()}；{settings.report_memory()}）")
+        return {'FINISHED'}
+
+class OBJECT_OT_bake_textures_farm(Operator):
+    """把选中物体分给多个后台 Blender 进程并行烘焙，完成后收集结果"""
+    bl_idname = "object.bake_textures_farm"
+    bl_label = "并行烘焙"
+    bl_options = {'REGISTER'}
+    
+    workers: IntProperty(
+        name="进程数",
+        description="后台 Blender 进程数量，0 为自动",
+        default=0,
+        min=0,
+        max=256
+    )
+    
+    single_pass: BoolProperty(
+        name="单次烘焙",
+        default=True
+    )
+    
+    use_cache: BoolProperty(
+        name="使用缓存",
+        default=True
+    )
+    
+    _timer = None
+    _farm = None
+    
+    def invoke(self, context, event):
+        return self.execute(context)
+    
+    def execute(self, context):
+        objects = [obj for obj in context.selected_objects if utils_bake.check_object(obj) is None]
+        if not objects:
+            self.report({'ERROR'}, "没有可烘焙的物体（需要第二UV图层）")
             return {'CANCELLED'}
         
-        # 设置渲染引擎为 Cycles
-        context.scene.render.engine = 'CYCLES'
-        
-        # 设置渲染设备为 GPU
-        context.scene.cycles.device = 'GPU'
-        
-        # 确保所有可用的GPU都被启用
-        preferences = context.preferences
-        cycles_preferences = preferences.addons['cycles'].preferences
-        cycles_preferences.compute_device_type = 'CUDA'
-        
-        # 启用所有可用的GPU设备
-        for device in cycles_preferences.devices:
-            device.use = True
-        
-        # 烘焙光照
-        image_node = self.setup_material(context, obj, lighting_image)
-        bpy.ops.object.bake(
-            type='DIFFUSE',
-            pass_filter={'DIRECT', 'INDIRECT', 'EMIT'},
-            use_clear=True,
-            margin=16
+        settings = utils_bake.BakeSettings.from_scene(
+            context.scene,
+            bake_type='COMBINED',
+            single_pass=self.single_pass,
+            use_cache=self.use_cache
         )
+        self._farm = utils_bake_farm.BakeFarm(objects, settings, self.workers)
+        try:
+            self._farm.start()
+        except Exception as e:
+            self._farm.cleanup()
+            self.report({'ERROR'}, f"启动后台烘焙失败: {str(e)}")
+            return {'CANCELLED'}
         
-        # 烘焙AO
-        image_node.image = ao_image
-        bpy.ops.object.bake(
-            type='AO',
-            use_clear=True,
-            margin=16
-        )
-        
-        # 合并贴图
-        lighting_pixels = list(lighting_image.pixels)
-        ao_pixels = list(ao_image.pixels)
-        final_pixels = []
-        
-        # 每4个值代表一个像素的RGBA
-        for i in range(0, len(lighting_pixels), 4):
-            # R通道设为0（黑色）
-            final_pixels.append(0)
-            # G通道设为AO值
-            final_pixels.append(ao_pixels[i])
-            # B通道设为光照值
-            final_pixels.append(lighting_pixels[i])
-            # Alpha通道设为1
-            final_pixels.append(1)
-        
-        # 更新最终贴图
-        final_image.pixels = final_pixels
-        final_image.update()
-        
-        # 烘焙完成后恢复原来的UV图层
-        obj.data.uv_layers.active = active_uv
-        
-        # 更新材质节点中的图像
-        mat = obj.material_slots[0].material
-        nodes = mat.node_tree.nodes
-        
-        # 清理现有节点
-        nodes.clear()
-        
-        # 创建基础节点
-        output_node = nodes.new('ShaderNodeOutputMaterial')
-        principled_bsdf = nodes.new('ShaderNodeBsdfPrincipled')
-        image_node = nodes.new('ShaderNodeTexImage')
-        uv_node = nodes.new('ShaderNodeUVMap')  # 添加UV Map节点
-        
-        # 设置节点位置
-        output_node.location = (300, 0)
-        principled_bsdf.location = (0, 0)
-        image_node.location = (-300, 0)
-        uv_node.location = (-500, 0)
-        
-        # 设置节点属性
-        image_node.image = final_image
-        uv_node.uv_map = obj.data.uv_layers[1].name  # 设置使用第二UV
-        
-        # 连接节点
-        links = mat.node_tree.links
-        links.new(uv_node.outputs[0], image_node.inputs[0])  # 连接UV到图像节点
-        links.new(image_node.outputs[0], principled_bsdf.inputs[0])
-        links.new(principled_bsdf.outputs[0], output_node.inputs[0])
+        wm = context.window_manager
+        wm.progress_begin(0, len(objects))
+        self._timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+        self.report({'INFO'}, f"{self._farm.worker_count} 个进程开始烘焙 {len(objects)} 个物体")
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self._farm.cancel()
+            self.finish(context)
+            self.report({'WARNING'}, "已取消并行烘焙")
+            return {'CANCELLED'}
         
-        self.report({'INFO'}, "已完成组合贴图烘焙")
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        
+        done = self._farm.poll()
+        context.window_manager.progress_update(done)
+        if self._farm.running():
+            return {'PASS_THROUGH'}
+        
+        # 所有进程结束：把结果读入当前文件
+        collected, failed = self._farm.collect(context)
+        self.finish(context)
+        if failed:
+            self.report({'WARNING'}, f"完成 {collected} 个，失败: {', '.join(failed)}，用时 {self._farm.elapsed():.1f}s")
+        else:
+            self.report({'INFO'}, f"完成 {collected} 个物体，用时 {self._farm.elapsed():.1f}s")
         return {'FINISHED'}
+    
+    def finish(self, context):
+        wm = context.window_manager
+        wm.progress_end()
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer)
+            self._timer = None
+        self._farm.cleanup()
 
 class OBJECT_OT_preview_lighting(Operator):
     """预览灯光贴图"""
@@ -327,6 +280,7 @@ class OBJECT_OT_restore_material(Operator):
 
 def register():
     bpy.utils.register_class(OBJECT_OT_bake_textures)
+    bpy.utils.register_class(OBJECT_OT_bake_textures_farm)
     bpy.utils.register_class(OBJECT_OT_preview_lighting)
     bpy.utils.register_class(OBJECT_OT_preview_ao)
     bpy.utils.register_class(OBJECT_OT_restore_material)
@@ -341,6 +295,7 @@ def register():
 
 def unregister():
     bpy.utils.unregister_class(OBJECT_OT_bake_textures)
+    bpy.utils.unregister_class(OBJECT_OT_bake_textures_farm)
     bpy.utils.unregister_class(OBJECT_OT_preview_lighting)
     bpy.utils.unregister_class(OBJECT_OT_preview_ao)
     bpy.utils.unregister_class(OBJECT_OT_restore_material)
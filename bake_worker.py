@@ -0,0 +1,55 @@
+"""并行烘焙的后台进程脚本
+
+blender --background farm.blend --python bake_worker.py -- job.json
+"""
+import bpy
+import os
+import sys
+import json
+import importlib
+import traceback
+
+def main():
+    job_path = sys.argv[sys.argv.index("--") + 1]
+    with open(job_path, encoding='utf-8') as f:
+        job = json.load(f)
+
+    # 插件未启用时从插件目录的上一级导入
+    root = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(root))
+    package = os.path.basename(root)
+    utils_bake = importlib.import_module(f"{package}.utils_bake")
+
+    context = bpy.context
+    if context.object is not None and context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    # 设备和线程数由主进程通过环境变量指定
+    settings = utils_bake.BakeSettings.from_dict(job['settings'])
+    settings.apply(context)
+    print(f"烘焙设置: {settings.report()}")
+
+    try:
+        settings.prepare_cache(context)
+        for index, name in job['objects']:
+            obj = bpy.data.objects.get(name)
+            error = utils_bake.check_object(obj)
+            if error:
+                print(f"{name}: {error}")
+                continue
+            try:
+                image, cached = utils_bake.bake_object(context, obj, settings)
+                utils_bake.save_image(image, os.path.join(job['output'], str(index) + utils_bake.file_format(image)[1]))
+            except Exception:
+                traceback.print_exc()
+                continue
+            peak = settings.peaks.get(name, 0) / 1024 ** 2
+            print(f"{name}: {'缓存' if cached else '完成'}（{settings.report_timings()}；峰值内存 {peak:.0f}MB）")
+            with open(job['progress'], 'a', encoding='utf-8') as f:
+                f.write(f"{index}\n")
+    finally:
+        # 用户偏好可能被自动保存，烘焙后恢复设备设置
+        settings.restore(context)
+
+if __name__ == "__main__":
+    main()
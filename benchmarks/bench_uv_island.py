@@ -0,0 +1,106 @@
+# 对比旧的逐面扫描 get_uv_island 与 utils_island.UVEdgeIndex 的岛生长
+# 用法: blender --background --factory-startup --python benchmarks/bench_uv_island.py -- [--max-reference-faces N]
+
+import os
+import sys
+import time
+import argparse
+import importlib.util
+
+import bpy
+import bmesh
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_addon():
+	spec = importlib.util.spec_from_file_location("cc_tools", os.path.join(ADDON_DIR, "__init__.py"), submodule_search_locations=[ADDON_DIR])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["cc_tools"] = module
+	spec.loader.exec_module(module)
+	return module
+
+
+def get_uv_island_scan(bm, uv_layer, start_face):
+	"""旧实现：每弹出一个面都扫描整个网格"""
+	island = set()
+	faces_to_process = {start_face}
+	while faces_to_process:
+		face = faces_to_process.pop()
+		if face not in island:
+			island.add(face)
+			face_edges = set()
+			for loop in face.loops:
+				uv = loop[uv_layer].uv.copy().freeze()
+				next_uv = loop.link_loop_next[uv_layer].uv.copy().freeze()
+				face_edges.add((uv, next_uv))
+			for other_face in bm.faces:
+				if other_face != face and other_face not in island:
+					other_edges = set()
+					for loop in other_face.loops:
+						uv = loop[uv_layer].uv.copy().freeze()
+						next_uv = loop.link_loop_next[uv_layer].uv.copy().freeze()
+						other_edges.add((uv, next_uv))
+						other_edges.add((next_uv, uv))
+					if face_edges & other_edges:
+						faces_to_process.add(other_face)
+	return list(island)
+
+
+def build_grid(face_count, island_size):
+	"""边长为sqrt(face_count)的网格，每 island_size x island_size 个面切成一个UV岛"""
+	side = int(round(face_count ** 0.5))
+	bm = bmesh.new()
+	bmesh.ops.create_grid(bm, x_segments=side, y_segments=side, size=1.0)
+	uv_layer = bm.loops.layers.uv.verify()
+	step = 1.0 / side
+	for face in bm.faces:
+		center = face.calc_center_median()
+		cell_x = int((center.x + 1.0) * 0.5 / step)
+		cell_y = int((center.y + 1.0) * 0.5 / step)
+		offset_x = (cell_x // island_size) * 0.01
+		offset_y = (cell_y // island_size) * 0.01
+		for loop in face.loops:
+			co = loop.vert.co
+			loop[uv_layer].uv = ((co.x + 1.0) * 0.5 + offset_x, (co.y + 1.0) * 0.5 + offset_y)
+	bm.faces.ensure_lookup_table()
+	return bm, uv_layer
+
+
+def timed(func, *args):
+	start = time.perf_counter()
+	result = func(*args)
+	return result, time.perf_counter() - start
+
+
+def main():
+	argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+	parser.add_argument("--island-size", type=int, default=8)
+	parser.add_argument("--max-reference-faces", type=int, default=100_000)
+	args = parser.parse_args(argv)
+
+	utils_island = load_addon().utils_island
+
+	print(f"{'faces':>10} {'island':>7} {'index build':>12} {'indexed grow':>13} {'scan grow':>12}")
+	for size in args.sizes:
+		bm, uv_layer = build_grid(size, args.island_size)
+		seed = bm.faces[len(bm.faces) // 2]
+
+		edge_index, build_time = timed(utils_island.UVEdgeIndex, bm, uv_layer)
+		island, grow_time = timed(edge_index.island, seed)
+
+		if len(bm.faces) <= args.max_reference_faces:
+			reference, scan_time = timed(get_uv_island_scan, bm, uv_layer, seed)
+			assert set(reference) == set(island)
+			scan = f"{scan_time:11.3f}s"
+		else:
+			scan = f"{'skipped':>12}"
+
+		print(f"{len(bm.faces):>10} {len(island):>7} {build_time:11.3f}s {grow_time:12.5f}s {scan}")
+		bm.free()
+
+
+if __name__ == "__main__":
+	main()
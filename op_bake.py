@@ -40,25 +40,45 @@ class op(bpy.types.Operator):
         items=[
             ('COMBINED', "组合", "烘焙组合贴图"),
             ('AO', "AO", "烘焙环境光遮蔽"),
-            ('LIGHT', "光照", "烘焙光照贴图")
+            ('LIGHT', "光照", "烘焙光照贴图"),
+            ('SHADOW', "阴影", "烘焙阴影贴图"),
+            ('NORMAL', "法线", "烘焙法线贴图")
         ],
         default='COMBINED'
     )
 
+    precision: EnumProperty(
+        name="存储精度",
+        items=utils_bake.PRECISIONS,
+        default='FLOAT'
+    )
+
     @classmethod
     def poll(cls, context):
         return context.active_object is not None and context.active_object.type == 'MESH'
 
+    def invoke(self, context, event):
+        # 从面板按钮调用时使用场景中的烘焙设置
+        scene = context.scene
+        self.resolution = scene.bake_resolution
+        self.samples = scene.bake_samples
+        self.margin = scene.bake_margin
+        self.bake_type = scene.bake_type
+        self.precision = scene.bake_precision
+        return self.execute(context)
+
     def execute(self, context):
         settings = utils_bake.BakeSettings()
         settings.resolution = int(self.resolution)
         settings.samples = self.samples
         settings.margin = self.margin
         settings.bake_type = self.bake_type
+        settings.precision = self.precision
         
         try:
-            utils_bake.bake_textures(context, settings)
-            self.report({'INFO'}, "烘焙完成")
+            results = utils_bake.bake_textures(context, settings)
+            cached = sum(1 for _, _, hit in results if hit)
+            self.report({'INFO'}, f"烘焙完成：{len(results)} 个物体（缓存 {cached} 个），{settings.report()}；{settings.report_timings()}；{settings.report_memory()}")
             return {'FINISHED'}
         except Exception as e:
             self.report({'ERROR'}, f"烘焙失败: {str(e)}")
@@ -1,10 +1,25 @@
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector
 from bpy.types import Operator
 from bpy.props import EnumProperty
 from . import utils_uv
 from . import utils_bbox
+from . import utils_island
+from . import utils_transform
+
+# 每个对齐方向在X/Y上对齐到总边界框的哪一侧
+ALIGN_X = {
+    'LEFT': 'MIN', 'LEFT_TOP': 'MIN', 'LEFT_BOTTOM': 'MIN',
+    'RIGHT': 'MAX', 'RIGHT_TOP': 'MAX', 'RIGHT_BOTTOM': 'MAX',
+    'CENTER': 'CENTER',
+}
+ALIGN_Y = {
+    'BOTTOM': 'MIN', 'LEFT_BOTTOM': 'MIN', 'RIGHT_BOTTOM': 'MIN',
+    'TOP': 'MAX', 'LEFT_TOP': 'MAX', 'RIGHT_TOP': 'MAX',
+    'CENTER': 'CENTER',
+}
 
 class op(bpy.types.Operator):
     bl_idname = "uv.textools_island_align"
@@ -60,13 +75,18 @@ class op(bpy.types.Operator):
         else:  # 'FACE', 'ISLAND' 或 'SYNC' 模式
             if selection_mode == 'FACE':
                 # 获取选中面所在的完整岛
-                selected_islands = utils_uv.getSelectionIslands(bm, uv_layer, extend_selection_to_islands=True)
+                selected_islands = utils_uv.getSelectionIslands(bm, uv_layer, extend_selection_to_islands=True, mesh=me)
             else:
                 # ISLAND或SYNC模式直接获取选中的岛
-                selected_islands = utils_uv.get_selected_islands(bm, uv_layer, selected=True)
+                selected_islands = utils_uv.get_selected_islands(bm, uv_layer, selected=True, mesh=me)
             
-            self.align_islands(bm, uv_layer, selected_islands)
+            # 只平移了整岛，岛缓存仍然有效
+            utils_island.island_cache.keep(me)
+            self.align_islands(me, uv_layer, selected_islands)
+            return {'FINISHED'}
 
+        # 只移动了部分UV点，可能拆开或合并岛
+        utils_island.island_cache.invalidate(me.session_uid)
         bmesh.update_edit_mesh(me)
         return {'FINISHED'}
 
@@ -115,49 +135,41 @@ class op(bpy.types.Operator):
                 uv.uv.x = max_x
                 uv.uv.y = min_y
 
-    def align_islands(self, bm, uv_layer, selected_islands):
+    def align_islands(self, me, uv_layer, selected_islands):
         if not selected_islands:
             return
 
-        # 使用BBox计算边界
-        all_groups = []
-        general_bbox = utils_bbox.BBox()
-        
-        # 计算每个岛的边界和总边界
-        for island in selected_islands:
-            bbox = utils_bbox.BBox.calc_bbox_uv(island, uv_layer)
-            general_bbox.union(bbox)
-            all_groups.append((island, bbox, uv_layer))
-
-        # 对齐UV岛
-        for island, bounds, uv_layer in all_groups:
-            delta = Vector((0, 0))
-            
-            if self.direction == 'LEFT':
-                delta = Vector(((general_bbox.min.x - bounds.min.x), 0))
-            elif self.direction == 'RIGHT':
-                delta = Vector(((general_bbox.max.x - bounds.max.x), 0))
-            elif self.direction == 'TOP':
-                delta = Vector((0, (general_bbox.max.y - bounds.max.y)))
-            elif self.direction == 'BOTTOM':
-                delta = Vector((0, (general_bbox.min.y - bounds.min.y)))
-            elif self.direction == 'CENTER':
-                delta = general_bbox.center - bounds.center
-            elif self.direction == 'LEFT_TOP':
-                delta = Vector((general_bbox.min.x - bounds.min.x, 
-                              general_bbox.max.y - bounds.max.y))
-            elif self.direction == 'RIGHT_TOP':
-                delta = Vector((general_bbox.max.x - bounds.max.x, 
-                              general_bbox.max.y - bounds.max.y))
-            elif self.direction == 'LEFT_BOTTOM':
-                delta = Vector((general_bbox.min.x - bounds.min.x, 
-                              general_bbox.min.y - bounds.min.y))
-            elif self.direction == 'RIGHT_BOTTOM':
-                delta = Vector((general_bbox.max.x - bounds.max.x, 
-                              general_bbox.min.y - bounds.min.y))
-
-            if delta != Vector((0, 0)):
-                utils_uv.translate_island(island, uv_layer, delta)
+        # 所有岛的边界框一次算出
+        transaction = utils_transform.UVTransaction()
+        group = transaction.add(me, uv_layer, selected_islands)
+        bounds = group.bounds()
+        general_bbox = bounds.union()
+
+        # 对齐UV岛：向量化计算每个岛的位移
+        dx = np.zeros(len(bounds))
+        dy = np.zeros(len(bounds))
+
+        align_x = ALIGN_X.get(self.direction)
+        if align_x == 'MIN':
+            dx = general_bbox.xmin - bounds.xmin
+        elif align_x == 'MAX':
+            dx = general_bbox.xmax - bounds.xmax
+        elif align_x == 'CENTER':
+            dx = general_bbox.center.x - bounds.center[:, 0]
+
+        align_y = ALIGN_Y.get(self.direction)
+        if align_y == 'MIN':
+            dy = general_bbox.ymin - bounds.ymin
+        elif align_y == 'MAX':
+            dy = general_bbox.ymax - bounds.ymax
+        elif align_y == 'CENTER':
+            dy = general_bbox.center.y - bounds.center[:, 1]
+
+        matrices = utils_transform.identity(len(bounds))
+        matrices[:, 0, 2] = dx
+        matrices[:, 1, 2] = dy
+        group.transform(matrices)
+        transaction.commit()
 
 def register():
     bpy.utils.register_class(op)
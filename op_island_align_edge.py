@@ -1,8 +1,10 @@
 import bpy
 import bmesh
 import math
+import numpy as np
 from . import utils_uv
-from . import settings
+from . import utils_island
+from . import utils_transform
 
 class op(bpy.types.Operator):
 	bl_idname = "uv.textools_island_align_edge"
@@ -29,50 +31,52 @@ class op(bpy.types.Operator):
 		return True
 
 	def execute(self, context):
-		utils_uv.multi_object_loop(main, context)
+		transaction = utils_transform.UVTransaction()
+		engine = utils_uv.MultiObjectRun(context)
+		engine.objects = [obj for obj in engine.objects if obj.data.uv_layers]
+		engine.run(main, transaction, update=False)
+		transaction.commit()
 		return {'FINISHED'}
 
-def main(context):
-	bm = bmesh.from_edit_mesh(bpy.context.active_object.data)
+def main(obj, bm, transaction):
+	me = obj.data
 	uv_layers = bm.loops.layers.uv.verify()
 
-	# 存储选择
-	selected_faces_edge_loops = utils_uv.selection_store(bm, uv_layers, return_selected_faces_edges=True)
+	# 选中两个UV点（即一条UV边）的面
+	visible_faces = [face for face in bm.faces if face.select]
+	selected_faces_edge_loops = {}
+	for face in visible_faces:
+		loops = [loop for loop in face.loops if loop[uv_layers].select]
+		if len(loops) == 2:
+			selected_faces_edge_loops[face] = loops
 	if not selected_faces_edge_loops:
 		return
 
-	# 收集岛和边对
-	selected_faces_islands, selected_faces_loops = utils_uv.getSelectionFacesIslands(bm, uv_layers, selected_faces_edge_loops)
-
-	# 对齐每个岛到其边
-	for face in selected_faces_loops:
-		align_island(selected_faces_loops[face][0][uv_layers].uv, selected_faces_loops[face][1][uv_layers].uv, selected_faces_islands[face])
-
-	# 恢复选择
-	utils_uv.selection_restore(bm, uv_layers)
-
-def align_island(uv_vert0, uv_vert1, faces):
-	bm = bmesh.from_edit_mesh(bpy.context.active_object.data)
-	uv_layers = bm.loops.layers.uv.verify()
-
-	# 选择面
-	bpy.ops.uv.select_all(action='DESELECT')
-	for face in faces:
-		for loop in face.loops:
-			loop[uv_layers].select = True
-
+	# 每个岛只取第一条选中的边
+	island_of = utils_island.face_island_indices(bm, uv_layers, visible_faces, mesh=me)
+	edge_of_island = {}
+	for face, loops in selected_faces_edge_loops.items():
+		edge_of_island.setdefault(island_of[face.index], loops)
+
+	islands = {label: [] for label in edge_of_island}
+	for face in visible_faces:
+		island = islands.get(island_of[face.index])
+		if island is not None:
+			island.append(face)
+
+	# 对齐每个岛到其边：直接计算旋转矩阵
+	matrices = [align_matrix(loops[0][uv_layers].uv, loops[1][uv_layers].uv) for loops in edge_of_island.values()]
+	transaction.add(me, uv_layers, list(islands.values())).transform(np.array(matrices))
+	utils_island.island_cache.keep(me)
+
+def align_matrix(uv_vert0, uv_vert1):
+	"""绕边的中点旋转，使边对齐到最近的轴向"""
 	diff = uv_vert1 - uv_vert0
 	current_angle = math.atan2(diff.x, diff.y)
 	angle_to_rotate = round(current_angle / (math.pi/2)) * (math.pi/2) - current_angle
 
-	# 根据Blender版本调整旋转方向
-	if settings.bversion == 2.83 or settings.bversion == 2.91:
-		angle_to_rotate = -angle_to_rotate
-
-	bpy.context.space_data.pivot_point = 'CURSOR'
-	bpy.ops.uv.cursor_set(location=uv_vert0 + diff/2)
-
-	bpy.ops.transform.rotate(value=angle_to_rotate, orient_axis='Z', constraint_axis=(False, False, False), orient_type='GLOBAL', mirror=False, use_proportional_edit=False)
+	# current_angle 从Y轴顺时针计量，因此逆时针旋转 -angle_to_rotate
+	return utils_transform.rotation(-angle_to_rotate, uv_vert0 + diff/2)
 
 def register():
 	bpy.utils.register_class(op)
@@ -1,8 +1,11 @@
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector
 from . import utils_uv
 from . import utils_bbox
+from . import utils_island
+from . import utils_transform
 
 class op(bpy.types.Operator):
 	bl_idname = "uv.textools_island_align_sort"
@@ -50,24 +53,26 @@ class op(bpy.types.Operator):
 			self.report({'ERROR_INVALID_INPUT'}, "没有选中的网格物体")
 			return {'CANCELLED'}
 
+		transaction = utils_transform.UVTransaction()
+
 		for obj in selected_objs:
 			bm = bmesh.from_edit_mesh(obj.data)
 			uv_layer = bm.loops.layers.uv.verify()
-			islands = utils_uv.get_selected_islands(bm, uv_layer, selected=False, extend_selection_to_islands=True)
+			islands = utils_uv.get_selected_islands(bm, uv_layer, selected=False, extend_selection_to_islands=True, mesh=obj.data)
 			
 			if not islands:
 				continue
-				
-			for island in islands:
-				bbox = utils_bbox.BBox.calc_bbox_uv(island, uv_layer)
-				general_bbox.union(bbox)
-				
-				if self.align:
-					angle = utils_uv.calc_min_align_angle(island, uv_layer)
-					utils_uv.rotate_island(island, uv_layer, angle)
-					bbox = utils_bbox.BBox.calc_bbox_uv(island, uv_layer)
-					
-				all_groups.append((island, bbox, uv_layer))
+
+			group = transaction.add(obj.data, uv_layer, islands)
+			general_bbox.union(group.bounds().union())
+
+			if self.align:
+				# 旋转只记录在事务中，包围盒由合成后的变换得到
+				island_uvs = group.island_uvs
+				angles = [utils_uv.calc_min_align_angle_pt(island_uvs.island_uvs(i)) for i in range(len(island_uvs))]
+				group.transform(np.array([utils_transform.rotation(angle) for angle in angles]))
+
+			all_groups.append((group, group.bounds()))
 				
 			bmeshes.append(bm)
 			update_obj.append(obj)
@@ -75,30 +80,35 @@ class op(bpy.types.Operator):
 		if not all_groups:
 			return {'CANCELLED'}
 
+		bounds = utils_bbox.BBoxArray.concatenate([b for _, b in all_groups])
+		owners = np.concatenate([np.full(len(b), i) for i, (_, b) in enumerate(all_groups)])
+		indices = np.concatenate([np.arange(len(b)) for _, b in all_groups])
+
 		# 按最大边长排序
-		all_groups.sort(key=lambda x: max(x[1].width, x[1].height), reverse=True)
+		order = np.argsort(-bounds.max_lenght, kind='stable')
 
-		# 变换UV
+		# 计算每个岛的位移：排在前面的岛的尺寸加间距累加得到起点
 		if self.is_vertical:
-			margin_x = general_bbox.min.x
-			margin_y = general_bbox.min.y
-
-			for island, bbox, uv_layer in all_groups:
-				delta = Vector((margin_x, margin_y)) - bbox.left_bottom
-				utils_uv.translate_island(island, uv_layer, delta)
-				margin_y += self.padding + bbox.height
+			steps = bounds.height[order] + self.padding
+			start_x = np.full(len(order), general_bbox.min.x)
+			start_y = general_bbox.min.y + np.concatenate(([0.0], np.cumsum(steps)[:-1]))
 		else:
-			margin_x = general_bbox.min.x
-			margin_y = general_bbox.min.y
+			steps = bounds.width[order] + self.padding
+			start_x = general_bbox.min.x + np.concatenate(([0.0], np.cumsum(steps)[:-1]))
+			start_y = np.full(len(order), general_bbox.min.y)
+
+		matrices = utils_transform.identity(len(order))
+		matrices[order, 0, 2] = start_x - bounds.xmin[order]
+		matrices[order, 1, 2] = start_y - bounds.ymin[order]
 
-			for island, bbox, uv_layer in all_groups:
-				delta = Vector((margin_x, margin_y)) - bbox.min
-				utils_uv.translate_island(island, uv_layer, delta)
-				margin_x += self.padding + bbox.width
+		for i, (group, _) in enumerate(all_groups):
+			mask = owners == i
+			group.transform(matrices[mask], indices[mask])
 
-		# 更新网格
+		# 变换UV并更新网格，每个物体只写回一次
 		for obj in update_obj:
-			bmesh.update_edit_mesh(obj.data)
+			utils_island.island_cache.keep(obj.data)
+		transaction.commit()
 
 		return {'FINISHED'}
 
@@ -1,8 +1,10 @@
 import bpy
 import bmesh
+import math
 import numpy as np
-from mathutils import Vector
 from . import utils_uv
+from . import utils_island
+from . import utils_transform
 
 precision = 5
 
@@ -42,45 +44,99 @@ class op(bpy.types.Operator):
         return True
 
     def execute(self, context):
-        utils_uv.multi_object_loop(main, self, context)
+        transaction = utils_transform.UVTransaction()
+        engine = utils_uv.MultiObjectRun(context)
+        engine.objects = [obj for obj in engine.objects if obj.data.uv_layers]
+        engine.run(main, self, transaction, update=False)
+        transaction.commit()
         return {'FINISHED'}
 
-def main(context):
-    bm = bmesh.from_edit_mesh(bpy.context.active_object.data)
+def main(obj, bm, self, transaction):
+    me = obj.data
     uv_layer = bm.loops.layers.uv.verify()
-    
-    # 获取选中的UV岛
-    selected_faces = []
-    for face in bm.faces:
-        if face.select:
-            selected_faces.append(face)
-    
+
+    # 非同步模式下只有选中的面可见
+    selected_faces = [face for face in bm.faces if face.select]
     if not selected_faces:
         return
-        
-    # 对齐UV岛
-    for face in selected_faces:
-        # 计算面的法线
-        normal = face.normal
-        
-        # 确定主轴
-        if self.axis == '-1':  # 自动
-            abs_normal = [abs(x) for x in normal]
-            dominant_axis = abs_normal.index(max(abs_normal))
-        else:
-            dominant_axis = int(self.axis)
-            
-        # 计算旋转角度
-        angle = utils_uv.calc_rotation_to_axis(normal, dominant_axis)
-        
-        # 旋转UV
-        if self.bool_face:
-            utils_uv.rotate_face(face, uv_layer, angle)
-        else:
-            island = utils_uv.get_island(bm, face, uv_layer)
-            utils_uv.rotate_island(island, uv_layer, angle)
-    
-    bmesh.update_edit_mesh(bpy.context.active_object.data)
+
+    # 每个岛（或每个面）只旋转一次
+    if self.bool_face:
+        islands = [[face] for face in selected_faces]
+    else:
+        islands = utils_island.calc_islands(bm, uv_layer, selected_faces, mesh=me)
+
+    angles = world_up_angles(islands, uv_layer, obj.matrix_world, self.axis)
+
+    # 以岛的UV中心为旋转中心，所有物体的旋转由事务统一写回
+    group = transaction.add(me, uv_layer, islands)
+    pivots = group.bounds().center
+    group.transform(np.array([utils_transform.rotation(angle, pivot) for angle, pivot in zip(angles.tolist(), pivots.tolist())]))
+    if self.bool_face:
+        # 单独旋转面会拆开原来的岛，缓存的岛编号不再有效
+        utils_island.island_cache.invalidate(me.session_uid)
+    else:
+        utils_island.island_cache.keep(me)
+
+def world_up_angles(islands, uv_layer, matrix_world, axis):
+    """每个岛使世界"上方"在UV中朝向 +V 所需的旋转角
+
+    朝向由岛的面积加权法线决定：朝向 Z 的面以世界 Y 为上方，其余以世界 Z 为上方；
+    方向从3D映射到UV时使用岛上面积最大的面"""
+    count = len(islands)
+    normals = np.zeros((count, 3))
+    corners = np.zeros((count, 3, 3))
+    uv_corners = np.zeros((count, 3, 2))
+    for index, island in enumerate(islands):
+        largest = None
+        largest_area = -1.0
+        for face in island:
+            area = face.calc_area()
+            normals[index] += np.array(face.normal) * area
+            if area > largest_area:
+                largest = face
+                largest_area = area
+        loops = largest.loops[:3]
+        corners[index] = [loop.vert.co for loop in loops]
+        uv_corners[index] = [loop[uv_layer].uv for loop in loops]
+
+    # 转到世界空间：法线乘逆转置，边向量只受线性部分影响
+    linear = np.array(matrix_world.to_3x3())
+    normals = normals @ np.linalg.pinv(linear)
+    corners = corners @ linear.T
+
+    if axis == '-1':
+        dominant = np.abs(normals).argmax(axis=1)
+    else:
+        dominant = np.full(count, int(axis))
+    up = np.zeros((count, 3))
+    up[np.arange(count), np.where(dominant == 2, 1, 2)] = 1.0
+
+    # 世界上方投影到岛所在平面
+    lengths = np.linalg.norm(normals, axis=1)
+    unit = normals / np.where(lengths > 0, lengths, 1.0)[:, None]
+    up -= unit * (up * unit).sum(axis=1)[:, None]
+
+    # 用面的两条边把平面内的方向换算为UV方向（最小二乘）
+    e1 = corners[:, 1] - corners[:, 0]
+    e2 = corners[:, 2] - corners[:, 0]
+    d1 = uv_corners[:, 1] - uv_corners[:, 0]
+    d2 = uv_corners[:, 2] - uv_corners[:, 0]
+    g11 = (e1 * e1).sum(axis=1)
+    g12 = (e1 * e2).sum(axis=1)
+    g22 = (e2 * e2).sum(axis=1)
+    r1 = (e1 * up).sum(axis=1)
+    r2 = (e2 * up).sum(axis=1)
+    det = g11 * g22 - g12 * g12
+    safe = np.where(np.abs(det) > 1e-12, det, 1.0)
+    a = (g22 * r1 - g12 * r2) / safe
+    b = (g11 * r2 - g12 * r1) / safe
+    direction = a[:, None] * d1 + b[:, None] * d2
+
+    angles = math.pi / 2 - np.arctan2(direction[:, 1], direction[:, 0])
+    # 退化的面或与世界上方垂直的岛不旋转
+    valid = (np.abs(det) > 1e-12) & (np.hypot(direction[:, 0], direction[:, 1]) > 1e-9)
+    return np.where(valid, angles, 0.0)
 
 def register():
     bpy.utils.register_class(op)
@@ -1,8 +1,10 @@
 import bpy
 import bmesh
 import math
-from mathutils import Vector, Matrix
-from . import utils_uv
+import numpy as np
+from bpy.props import BoolProperty
+from . import utils_island
+from . import utils_transform
 
 class op(bpy.types.Operator):
     bl_idname = "cc.uv_island_orient"
@@ -10,6 +12,12 @@ class op(bpy.types.Operator):
     bl_description = "将UV岛按选中的边旋转到最接近的轴向"
     bl_options = {'REGISTER', 'UNDO'}
     
+    weighted_vote: BoolProperty(
+        name="按边长投票",
+        description="同一岛上选中多条边且方向不一致时，按边长加权决定旋转角度；否则以最长的边为准",
+        default=False
+    )
+
     @classmethod
     def poll(cls, context):
         if not context.active_object:
@@ -30,85 +38,76 @@ class op(bpy.types.Operator):
         bm = bmesh.from_edit_mesh(me)
         uv_layer = bm.loops.layers.uv.verify()
 
-        # 存储选择状态
-        selected_uvs = []
-        for face in bm.faces:
-            for loop in face.loops:
-                if loop[uv_layer].select:
-                    selected_uvs.append(loop)
-
-        # 获取选中的UV边
-        selected_edges = []
-        for face in bm.faces:
+        # 获取选中的UV边（非同步模式下只有选中的面可见）
+        visible_faces = [face for face in bm.faces if face.select]
+        starts = []
+        ends = []
+        edge_faces = []
+        for face in visible_faces:
             for loop in face.loops:
                 if loop[uv_layer].select and loop.link_loop_next[uv_layer].select:
-                    selected_edges.append((loop, loop.link_loop_next))
+                    starts.append(loop[uv_layer].uv[:])
+                    ends.append(loop.link_loop_next[uv_layer].uv[:])
+                    edge_faces.append(face)
 
-        if not selected_edges:
+        if not edge_faces:
             self.report({'WARNING'}, "请选择UV边")
             return {'CANCELLED'}
 
-        # 处理每个选中的边
-        for edge_start, edge_end in selected_edges:
-            # 获取边的UV坐标
-            uv_start = edge_start[uv_layer].uv
-            uv_end = edge_end[uv_layer].uv
-            
-            # 计算边的方向向量
-            edge_vector = uv_end - uv_start
-            edge_length = edge_vector.length
-            
-            if edge_length < 0.0001:  # 避免处理过短的边
-                continue
-                
-            # 计算与X轴和Y轴的夹角
-            angle = math.atan2(edge_vector.y, edge_vector.x)
-            
-            # 计算到四个主要方向的角度差的绝对值
-            angles = [
-                (0, abs(angle)),                    # 到X轴正向的角度
-                (math.pi/2, abs(angle - math.pi/2)),   # 到Y轴正向的角度
-                (math.pi, abs(abs(angle) - math.pi)),  # 到X轴负向的角度
-                (-math.pi/2, abs(angle + math.pi/2)),  # 到Y轴负向的角度
-            ]
-            
-            # 找到最小角度差对应的目标角度
-            target_angle, min_diff = min(angles, key=lambda x: x[1])
-            angle_diff = target_angle - angle
-
-            # 获取边的中点作为旋转中心
-            pivot = (uv_start + uv_end) / 2
-
-            # 选择整个UV岛
-            bpy.ops.uv.select_all(action='DESELECT')
-            edge_start[uv_layer].select = True
-            edge_end[uv_layer].select = True
-            bpy.ops.uv.select_linked()  # 选择相连的UV
-            
-            # 获取选中的UV点并进行旋转
-            selected_points = []
-            for face in bm.faces:
-                for loop in face.loops:
-                    if loop[uv_layer].select:
-                        selected_points.append(loop)
-            
-            # 创建旋转矩阵
-            rot_mat = Matrix.Rotation(angle_diff, 2)
-            
-            # 应用旋转
-            for loop in selected_points:
-                uv = loop[uv_layer].uv
-                # 相对于pivot点进行旋转
-                uv_local = uv - pivot
-                uv_rotated = rot_mat @ uv_local
-                loop[uv_layer].uv = uv_rotated + pivot
-
-        # 恢复原始选择
-        bpy.ops.uv.select_all(action='DESELECT')
-        for loop in selected_uvs:
-            loop[uv_layer].select = True
-
-        bmesh.update_edit_mesh(me)
+        # 一次分岛，把选中的边按岛分组
+        island_of = utils_island.face_island_indices(bm, uv_layer, visible_faces, mesh=me)
+        labels = np.array([island_of[face.index] for face in edge_faces])
+        starts = np.array(starts)
+        ends = np.array(ends)
+
+        vectors = ends - starts
+        lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+        valid = lengths >= 0.0001  # 避免处理过短的边
+        if not valid.any():
+            return {'CANCELLED'}
+        labels = labels[valid]
+        starts = starts[valid]
+        ends = ends[valid]
+        lengths = lengths[valid]
+        vectors = vectors[valid]
+
+        # 每条边转到最近轴向所需的旋转角，范围 [-45°, 45°]
+        angles = np.arctan2(vectors[:, 1], vectors[:, 0])
+        quarter = math.pi / 2
+        diffs = np.round(angles / quarter) * quarter - angles
+
+        # 每个岛只计算一个旋转角
+        island_labels, inverse = np.unique(labels, return_inverse=True)
+        inverse = inverse.ravel()
+        longest = np.full(len(island_labels), -1)
+        for i in np.argsort(lengths).tolist():
+            longest[inverse[i]] = i
+
+        if self.weighted_vote:
+            # 边的方向以90°为周期，按边长加权求圆周平均
+            weight_cos = np.bincount(inverse, lengths * np.cos(diffs * 4), len(island_labels))
+            weight_sin = np.bincount(inverse, lengths * np.sin(diffs * 4), len(island_labels))
+            island_angles = np.arctan2(weight_sin, weight_cos) / 4
+        else:
+            # 以岛上最长的选中边为准
+            island_angles = diffs[longest]
+
+        # 以决定角度的最长边中点为旋转中心
+        pivots = (starts[longest] + ends[longest]) / 2
+
+        faces_of = {label: [] for label in island_labels.tolist()}
+        for face in visible_faces:
+            faces = faces_of.get(island_of[face.index])
+            if faces is not None:
+                faces.append(face)
+        islands = [faces_of[label] for label in island_labels.tolist()]
+
+        # 所有旋转一次性写回，选择状态不受影响
+        matrices = np.array([utils_transform.rotation(angle, pivot) for angle, pivot in zip(island_angles.tolist(), pivots.tolist())])
+        transaction = utils_transform.UVTransaction()
+        transaction.add(me, uv_layer, islands).transform(matrices)
+        utils_island.island_cache.keep(me)
+        transaction.commit()
         return {'FINISHED'}
 
 def register():
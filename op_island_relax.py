@@ -2,6 +2,7 @@ import bpy
 import bmesh
 from mathutils import Vector
 from bpy.props import BoolProperty, IntProperty, FloatProperty
+from . import utils_island
 
 class op(bpy.types.Operator):
     bl_idname = "uv.textools_island_relax"
@@ -76,6 +77,7 @@ class op(bpy.types.Operator):
             # 再次应用minimize_stretch
             bpy.ops.uv.minimize_stretch(iterations=self.iterations)
 
+        utils_island.island_cache.invalidate(me.session_uid)
         bmesh.update_edit_mesh(me)
         return {'FINISHED'}
 
@@ -1,9 +1,12 @@
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector
 from bpy.props import BoolProperty, FloatProperty, EnumProperty
 from . import utils_uv
 from . import utils_bbox
+from . import utils_island
+from . import utils_transform
 
 class op(bpy.types.Operator):
     bl_idname = "uv.textools_island_scale"
@@ -51,19 +54,18 @@ class op(bpy.types.Operator):
         # 获取选中的岛
         selected_islands = []
         if context.scene.tool_settings.uv_select_mode == 'FACE':
-            selected_islands = utils_uv.getSelectionIslands(bm, uv_layer, extend_selection_to_islands=True)
+            selected_islands = utils_uv.getSelectionIslands(bm, uv_layer, extend_selection_to_islands=True, mesh=me)
         else:
-            selected_islands = utils_uv.get_selected_islands(bm, uv_layer, selected=True)
+            selected_islands = utils_uv.get_selected_islands(bm, uv_layer, selected=True, mesh=me)
             
         if not selected_islands:
             self.report({'WARNING'}, "没有选中的UV岛")
             return {'CANCELLED'}
             
-        # 计算所有岛的边界框
-        island_bboxes = []
-        for island in selected_islands:
-            bbox = utils_bbox.BBox.calc_bbox_uv(island, uv_layer)
-            island_bboxes.append((island, bbox))
+        # 一次计算所有岛的边界框
+        transaction = utils_transform.UVTransaction()
+        group = transaction.add(me, uv_layer, selected_islands)
+        bounds = group.bounds()
             
         # 获取约束条件
         scale_x = context.scene.uv_scale_x
@@ -78,35 +80,44 @@ class op(bpy.types.Operator):
         
         # 找到目标大小
         if self.scale_mode == 'MAX':
-            target_x = max(bbox.width for _, bbox in island_bboxes)
-            target_y = max(bbox.height for _, bbox in island_bboxes)
+            target_x = bounds.width.max()
+            target_y = bounds.height.max()
         else:  # MIN
-            target_x = min(bbox.width for _, bbox in island_bboxes)
-            target_y = min(bbox.height for _, bbox in island_bboxes)
-        
+            target_x = bounds.width.min()
+            target_y = bounds.height.min()
+
+        # 宽或高为0的岛在该方向上不缩放
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio_x = np.where(bounds.width > 0, target_x / bounds.width, 1.0)
+            ratio_y = np.where(bounds.height > 0, target_y / bounds.height, 1.0)
+        ones = np.ones(len(bounds))
+
         # 缩放每个岛
-        for island, bbox in island_bboxes:
-            if lock_ratio:
-                # 锁定比例时，使用平均缩放比例
-                if scale_x and scale_y:
-                    # 计算平均缩放比例
-                    scale_factor_x = target_x / bbox.width
-                    scale_factor_y = target_y / bbox.height
-                    scale_factor = (scale_factor_x + scale_factor_y) / 2
-                    utils_uv.scale_island(island, uv_layer, scale_factor, scale_factor)
-                elif scale_x:
-                    scale_factor = target_x / bbox.width
-                    utils_uv.scale_island(island, uv_layer, scale_factor, scale_factor)
-                elif scale_y:
-                    scale_factor = target_y / bbox.height
-                    utils_uv.scale_island(island, uv_layer, scale_factor, scale_factor)
+        if lock_ratio:
+            # 锁定比例时，使用平均缩放比例
+            if scale_x and scale_y:
+                factor_x = factor_y = (ratio_x + ratio_y) / 2
+            elif scale_x:
+                factor_x = factor_y = ratio_x
+            elif scale_y:
+                factor_x = factor_y = ratio_y
             else:
-                # 不锁定比例时，分别处理X和Y方向
-                scale_factor_x = target_x / bbox.width if scale_x else 1.0
-                scale_factor_y = target_y / bbox.height if scale_y else 1.0
-                utils_uv.scale_island(island, uv_layer, scale_factor_x, scale_factor_y)
+                factor_x = factor_y = ones
+        else:
+            # 不锁定比例时，分别处理X和Y方向
+            factor_x = ratio_x if scale_x else ones
+            factor_y = ratio_y if scale_y else ones
+
+        center = bounds.center
+        matrices = utils_transform.identity(len(bounds))
+        matrices[:, 0, 0] = factor_x
+        matrices[:, 1, 1] = factor_y
+        matrices[:, 0, 2] = center[:, 0] - factor_x * center[:, 0]
+        matrices[:, 1, 2] = center[:, 1] - factor_y * center[:, 1]
+        group.transform(matrices)
 
-        bmesh.update_edit_mesh(me)
+        utils_island.island_cache.keep(me)
+        transaction.commit()
         return {'FINISHED'}
 
 def register():
@@ -1,6 +1,7 @@
 import bpy
-import bmesh
+import time
 from bpy.props import FloatProperty
+from . import utils_mesh
 
 class op(bpy.types.Operator):
     bl_idname = "cc.mesh_tools"
@@ -24,30 +25,36 @@ class op(bpy.types.Operator):
                 context.active_object.mode == 'EDIT')
 
     def execute(self, context):
-        obj = context.active_object
-        me = obj.data
-        bm = bmesh.from_edit_mesh(me)
+        start = time.perf_counter()
+        objects = [obj for obj in context.objects_in_mode_unique_data if obj.type == 'MESH']
         
         try:
-            # 获取选中的边
-            selected_edges = [e for e in bm.edges if e.select]
+            processed = 0
+            changed = 0
+            for obj in objects:
+                me = obj.data
+                # 二面角来自分析缓存（先把编辑网格同步到网格数据）
+                utils_mesh.sync(obj)
+                angles = utils_mesh.analyze(me).angles(me)
+                
+                # 获取选中的边
+                selected = utils_mesh.read_array(me.edges, 'select', bool, len(me.edges))
+                if not selected.any():
+                    continue
+                
+                # 设置锐边，只改写状态变化的边
+                sharp = utils_mesh.read_flags(me, 'SHARP')
+                sharp[selected] = angles[selected] > self.sharp_angle
+                changed += utils_mesh.write_flags(obj, 'SHARP', sharp)
+                processed += int(selected.sum())
+                me.show_edge_sharp = True
             
-            if not selected_edges:
+            if not processed:
                 self.report({'WARNING'}, "没有选中的边")
                 return {'CANCELLED'}
             
-            # 设置锐边
-            for edge in selected_edges:
-                if edge.calc_face_angle() > self.sharp_angle:
-                    edge.smooth = False
-                else:
-                    edge.smooth = True
-            
-            # 更新网格
-            bmesh.update_edit_mesh(me)
-            me.show_edge_sharp = True
-            
-            self.report({'INFO'}, f"处理了 {len(selected_edges)} 条边")
+            elapsed = (time.perf_counter() - start) * 1000
+            self.report({'INFO'}, f"处理了 {processed} 条边，改变 {changed} 条，用时 {elapsed:.1f}ms")
             return {'FINISHED'}
             
         except Exception as e:
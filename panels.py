@@ -4,6 +4,8 @@ import math
 import os
 from . import utils_export
 from . import op_island_orient
+from . import smooth_faces
+from . import utils_mesh
 
 class VIEW3D_PT_cc_export(Panel):
     bl_label = "CC Export"
@@ -59,6 +61,7 @@ class VIEW3D_PT_cc_mesh(Panel):
         row = col1.row(align=True)
         row.operator("mesh.mark_sharp_by_angle", text="设置锐边")
         row.prop(context.scene, "sharp_angle", text="")
+        row.prop(context.scene, "sharp_angle_live", text="", icon='HIDE_OFF')
         
         # 转换工具部分
         box = col.box()
@@ -70,6 +73,19 @@ class VIEW3D_PT_cc_mesh(Panel):
         row = col2.row(align=True)
         row.operator("mesh.uv_boundary_to_sharp", text="UV边界转锐边")
         row.operator("mesh.sharp_to_uv_boundary", text="锐边转UV边界")
+        col2.operator("mesh.seams_from_uv_islands", text="UV岛生成缝合线")
+        
+        # 顶点拆分估算
+        box = col.box()
+        col3 = box.column(align=True)
+        col3.label(text="引擎顶点数:")
+        col3.operator("mesh.estimate_vertex_splits", text="估算顶点拆分")
+        for name, estimate in utils_mesh.split_estimates.items():
+            col3.label(text=f"{name}: {estimate.verts} -> {estimate.split_verts} (x{estimate.ratio:.2f})")
+            col3.label(text=f"    拆分边: {estimate.split_edges}")
+            if estimate.worst_edges:
+                worst = ", ".join(f"#{edge}({copies})" for edge, copies in estimate.worst_edges)
+                col3.label(text=f"    最严重的边: {worst}")
 
 class VIEW3D_PT_cc_bake(Panel):
     bl_label = "CC Bake"
@@ -102,11 +118,13 @@ class VIEW3D_PT_cc_bake(Panel):
         col2.label(text="高级设置:")
         col2.prop(context.scene, "bake_samples", text="采样数")
         col2.prop(context.scene, "bake_margin", text="边缘扩展")
+        col2.prop(context.scene, "bake_precision", text="存储精度")
         
         # 烘焙和预览按钮
         box = col.box()
         col3 = box.column(align=True)
         col3.operator("cc.bake_textures", text="开始烘", icon='RENDER_STILL')
+        col3.operator("object.bake_textures_farm", text="并行烘焙选中物体", icon='RENDERLAYERS')
         
         row = col3.row(align=True)
         op1 = row.operator("object.preview_bake", text="预览组合")
@@ -272,7 +290,14 @@ def register():
         precision=1,
         step=100,
         subtype='ANGLE',
-        unit='ROTATION'
+        unit='ROTATION',
+        update=smooth_faces.update_sharp_angle
+    )
+    
+    bpy.types.Scene.sharp_angle_live = bpy.props.BoolProperty(
+        name="实时预览",
+        description="按角度设置锐边后，拖动角度时直接更新锐边",
+        default=False
     )
     
     # 烘焙属性
@@ -331,6 +356,8 @@ def unregister():
         del bpy.types.Scene.manual_directory
     if hasattr(bpy.types.Scene, 'sharp_angle'):
         del bpy.types.Scene.sharp_angle
+    if hasattr(bpy.types.Scene, 'sharp_angle_live'):
+        del bpy.types.Scene.sharp_angle_live
     if hasattr(bpy.types.Scene, 'bake_resolution'):
         del bpy.types.Scene.bake_resolution
     if hasattr(bpy.types.Scene, 'bake_type'):
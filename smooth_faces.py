@@ -1,6 +1,33 @@
 import bpy
+import time
 from bpy.types import Operator
-from bpy.props import FloatProperty
+from bpy.props import FloatProperty, EnumProperty
+from . import utils_mesh
+
+def run_on_meshes(operator, context, func, need_uv=False):
+    """对所有选中的网格（共用数据的只处理一次）调用 func(obj)，汇总改变的数量和耗时"""
+    start = time.perf_counter()
+    objects = utils_mesh.unique_mesh_objects(context)
+    if not objects:
+        operator.report({'ERROR'}, "请选择一个网格物体")
+        return {'CANCELLED'}
+
+    # 检查是否有UV
+    if need_uv:
+        objects = [obj for obj in objects if obj.data.uv_layers]
+        if not objects:
+            operator.report({'ERROR'}, "物体没有UV贴图")
+            return {'CANCELLED'}
+
+    changed = 0
+    for obj in objects:
+        # 编辑模式下先同步网格数据，不切换模式
+        utils_mesh.sync(obj)
+        changed += func(obj)
+
+    elapsed = (time.perf_counter() - start) * 1000
+    operator.report({'INFO'}, f"处理了 {len(objects)} 个网格，改变 {changed} 条边，用时 {elapsed:.1f}ms")
+    return {'FINISHED'}
 
 class MESH_OT_smooth_selected_faces(Operator):
     """清除所选面的锐边并设置区域环为锐边"""
@@ -9,239 +36,206 @@ class MESH_OT_smooth_selected_faces(Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        obj = context.active_object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "请选择一个网格物体")
-            return {'CANCELLED'}
-        
-        # 设置物体为 Shade Smooth
-        bpy.ops.object.shade_smooth()
-            
-        bpy.ops.object.mode_set(mode='EDIT')
-        # 存储当前选择模式
-        current_mode = tuple(context.tool_settings.mesh_select_mode)
-        
-        # 切换到面选择模式
-        bpy.ops.mesh.select_mode(type='FACE')
-        
-        # 清除所选面的锐边
-        bpy.ops.mesh.mark_sharp(clear=True)
-        
-        # 选择区域边界环
-        bpy.ops.mesh.region_to_loop()
-        
-        # 将边界设为锐边
-        bpy.ops.mesh.mark_sharp()
-        
-        # 恢复原来的选择模式
-        context.tool_settings.mesh_select_mode = current_mode
-        
-        return {'FINISHED'}
+        def smooth(obj):
+            mesh = obj.data
+            # 设置物体为 Shade Smooth
+            utils_mesh.shade_smooth(obj)
+
+            face_mask = utils_mesh.selected_faces(mesh)
+            if not face_mask.any():
+                return 0
+
+            # 由面选择和边-面关系直接求出区域边界，不改变选择和选择模式
+            inside, boundary = utils_mesh.analyze(mesh).region_boundary(face_mask)
+
+            # 清除所选面的锐边，并将边界设为锐边
+            sharp = utils_mesh.read_flags(mesh, 'SHARP')
+            sharp[inside] = False
+            sharp[boundary] = True
+            return utils_mesh.write_flags(obj, 'SHARP', sharp)
+
+        return run_on_meshes(self, context, smooth)
 
 class MESH_OT_mark_sharp_by_angle(Operator):
     """基于角度设置锐边"""
     bl_idname = "mesh.mark_sharp_by_angle"
     bl_label = "按角度设置锐边"
     bl_options = {'REGISTER', 'UNDO'}
-    
+
     def execute(self, context):
-        obj = context.active_object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "请选择一个网格物体")
-            return {'CANCELLED'}
-        
-        # 设置物体为 Shade Smooth
-        bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.shade_smooth()
-        
-        # 存储当前模式
-        current_mode = obj.mode
-        if current_mode != 'EDIT':
-            bpy.ops.object.mode_set(mode='EDIT')
-        
-        # 存储当前选择模式
-        current_select_mode = tuple(context.tool_settings.mesh_select_mode)
-        
         # 获取角度值
         angle = context.scene.sharp_angle
-        
-        # 切换到对象模式以访问网格数据
-        bpy.ops.object.mode_set(mode='OBJECT')
-        mesh = obj.data
-        
-        # 创建面到边的映射
-        face_to_edges = {}
-        edge_to_faces = {}
-        
-        # 获取所有面的法线和边的信息
-        for face in mesh.polygons:
-            face_to_edges[face.index] = set(face.edge_keys)
-            for edge_key in face.edge_keys:
-                if edge_key not in edge_to_faces:
-                    edge_to_faces[edge_key] = []
-                edge_to_faces[edge_key].append((face.index, face.normal))
-        
-        # 检查是否有选中的面
-        selected_faces = set()
-        for face in mesh.polygons:
-            if face.select:
-                selected_faces.add(face.index)
-        
-        # 如果没有选中的面，处理所有面
-        if not selected_faces:
-            selected_faces = set(face.index for face in mesh.polygons)
-        
-        # 处理选中面的边
-        edges_to_process = set()
-        for face_index in selected_faces:
-            edges_to_process.update(face_to_edges[face_index])
-        
-        # 清除并设置锐边
-        for edge in mesh.edges:
-            edge_key = tuple(sorted((edge.vertices[0], edge.vertices[1])))
-            if edge_key in edges_to_process:
-                # 默认清除锐边
-                edge.use_edge_sharp = False
-                
-                # 获取相邻面的信息
-                connected_faces = edge_to_faces.get(edge_key, [])
-                max_angle = 0
-                
-                # 计算这条边邻面之间的最大角度
-                for i, (face1_idx, normal1) in enumerate(connected_faces):
-                    for face2_idx, normal2 in connected_faces[i+1:]:
-                        angle_rad = normal1.angle(normal2)
-                        max_angle = max(max_angle, angle_rad)
-                
-                # 如果最大角度超过阈值，设置为锐边
-                if max_angle > angle:
-                    edge.use_edge_sharp = True
-        
-        # 切换回编辑模式
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        # 恢复选择模式
-        context.tool_settings.mesh_select_mode = current_select_mode
-        
-        return {'FINISHED'}
+
+        def mark(obj):
+            mesh = obj.data
+            # 设置物体为 Shade Smooth
+            utils_mesh.shade_smooth(obj)
+
+            # 拓扑和二面角来自分析缓存，网格未变时只重新比较阈值
+            # 只处理选中面的边，没有选中的面时处理所有面
+            preview = utils_mesh.SharpPreview.build(mesh, utils_mesh.analyze(mesh), angle)
+
+            # 清除并设置锐边，一次写回
+            changed = utils_mesh.write_flags(obj, 'SHARP', preview.mask)
+
+            # 之后拖动角度滑块时只改写状态翻转的边
+            utils_mesh.sharp_previews[mesh.session_uid] = preview
+            return changed
+
+        return run_on_meshes(self, context, mark)
+
+class MESH_OT_apply_sharp_angle(Operator):
+    """把实时预览的锐边角度写入网格"""
+    bl_idname = "mesh.apply_sharp_angle"
+    bl_label = "应用锐边角度"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        angle = context.scene.sharp_angle
+
+        def apply(obj):
+            preview = utils_mesh.sharp_previews.get(obj.data.session_uid)
+            if preview is None:
+                return 0
+            return preview.apply(obj, angle)
+
+        return run_on_meshes(self, context, apply)
+
+# 滑块停止这么久（秒）之后再通过操作符写入，生成撤销步骤
+SHARP_APPLY_DELAY = 0.3
+last_sharp_change = 0.0
+
+def update_sharp_angle(scene, context):
+    """实时预览：角度变化时只改写翻转的边，停止拖动后由 apply_sharp_angle 最终写入"""
+    global last_sharp_change
+    if not scene.sharp_angle_live:
+        return
+    previewed = False
+    for obj in utils_mesh.unique_mesh_objects(context):
+        preview = utils_mesh.sharp_previews.get(obj.data.session_uid)
+        if preview is not None:
+            preview.update(obj, scene.sharp_angle)
+            previewed = True
+    if previewed:
+        last_sharp_change = time.perf_counter()
+        if not bpy.app.timers.is_registered(apply_sharp_angle_later):
+            bpy.app.timers.register(apply_sharp_angle_later, first_interval=SHARP_APPLY_DELAY)
+
+def apply_sharp_angle_later():
+    remaining = last_sharp_change + SHARP_APPLY_DELAY - time.perf_counter()
+    if remaining > 0:
+        return remaining
+    try:
+        bpy.ops.mesh.apply_sharp_angle()
+    except RuntimeError:
+        # 已离开可以执行的上下文（例如切换了模式），下次按角度设置锐边时会重建
+        pass
+    return None
 
 class MESH_OT_sharp_to_seam(Operator):
     """将锐边设置为缝合线"""
     bl_idname = "mesh.sharp_to_seam"
     bl_label = "锐边转缝合线"
     bl_options = {'REGISTER', 'UNDO'}
-    
+
     def execute(self, context):
-        obj = context.active_object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "请选择一个网格物体")
-            return {'CANCELLED'}
-        
-        # 存储当前模式
-        current_mode = obj.mode
-        if current_mode != 'EDIT':
-            bpy.ops.object.mode_set(mode='EDIT')
-        
-        # 切换到对象模式以访问网格数据
-        bpy.ops.object.mode_set(mode='OBJECT')
-        mesh = obj.data
-        
         # 找到所有锐边并设置为缝合线
-        for edge in mesh.edges:
-            if edge.use_edge_sharp:
-                edge.use_seam = True
-        
-        # 切换回编辑模式
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        # 恢复原始模式
-        if current_mode != 'EDIT':
-            bpy.ops.object.mode_set(mode=current_mode)
-        
-        return {'FINISHED'}
+        def convert(obj):
+            sharp = utils_mesh.read_flags(obj.data, 'SHARP')
+            return utils_mesh.write_edge_mask(obj, sharp, target='SEAM', extend=True)
+
+        return run_on_meshes(self, context, convert)
+
+edge_targets = [
+    ('SHARP', "锐边", "写入锐边"),
+    ('SEAM', "缝合线", "写入缝合线"),
+    ('BOTH', "锐边和缝合线", "同时写入锐边和缝合线"),
+]
 
 class MESH_OT_uv_boundary_to_sharp(Operator):
     """将UV边界设置为锐边"""
     bl_idname = "mesh.uv_boundary_to_sharp"
     bl_label = "UV边界转锐边"
     bl_options = {'REGISTER', 'UNDO'}
-    
+
+    target: EnumProperty(
+        name="写入",
+        items=edge_targets,
+        default='SHARP'
+    )
+
+    def execute(self, context):
+        # 清除原有标记，只保留UV边界
+        def convert(obj):
+            mask = utils_mesh.uv_split_edges(obj.data)
+            return utils_mesh.write_edge_mask(obj, mask, target=self.target)
+
+        return run_on_meshes(self, context, convert, need_uv=True)
+
+class MESH_OT_seams_from_uv_islands(Operator):
+    """按UV岛边界添加缝合线"""
+    bl_idname = "mesh.seams_from_uv_islands"
+    bl_label = "UV岛生成缝合线"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    target: EnumProperty(
+        name="写入",
+        items=edge_targets,
+        default='SEAM'
+    )
+
     def execute(self, context):
-        obj = context.active_object
-        if obj is None or obj.type != 'MESH':
+        # 与UV边界转锐边共用同一个计算，保留原有标记
+        def convert(obj):
+            mask = utils_mesh.uv_split_edges(obj.data)
+            return utils_mesh.write_edge_mask(obj, mask, target=self.target, extend=True)
+
+        return run_on_meshes(self, context, convert, need_uv=True)
+
+class MESH_OT_estimate_vertex_splits(Operator):
+    """估算导出到游戏引擎后因锐边、平直面和UV边界拆分产生的顶点数"""
+    bl_idname = "mesh.estimate_vertex_splits"
+    bl_label = "估算顶点拆分"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        start = time.perf_counter()
+        objects = utils_mesh.unique_mesh_objects(context)
+        if not objects:
             self.report({'ERROR'}, "请选择一个网格物体")
             return {'CANCELLED'}
-        
-        # 检查是否有UV
-        if not obj.data.uv_layers:
-            self.report({'ERROR'}, "物体没有UV贴图")
-            return {'CANCELLED'}
-        
-        # 存储当前模式
-        current_mode = obj.mode
-        if current_mode != 'EDIT':
-            bpy.ops.object.mode_set(mode='EDIT')
-        
-        # 切换到对象模式以访问网格数据
-        bpy.ops.object.mode_set(mode='OBJECT')
-        mesh = obj.data
-        
-        # 获取UV层
-        uv_layer = mesh.uv_layers.active.data
-        
-        # 创建边到UV坐标的映射
-        edge_to_uvs = {}
-        
-        # 遍历所有面的UV数据
-        for poly in mesh.polygons:
-            for i in range(poly.loop_total):
-                current_loop_idx = poly.loop_start + i
-                next_loop_idx = poly.loop_start + ((i + 1) % poly.loop_total)
-                
-                # 获取边的顶点索引
-                current_vert = mesh.loops[current_loop_idx].vertex_index
-                next_vert = mesh.loops[next_loop_idx].vertex_index
-                edge_key = tuple(sorted((current_vert, next_vert)))
-                
-                # 获取UV坐标并进行舍入以避免浮点误差
-                uv1 = tuple(round(x, 6) for x in uv_layer[current_loop_idx].uv)
-                uv2 = tuple(round(x, 6) for x in uv_layer[next_loop_idx].uv)
-                uv_edge = tuple(sorted([uv1, uv2]))
-                
-                # 存储UV边
-                if edge_key not in edge_to_uvs:
-                    edge_to_uvs[edge_key] = set()
-                edge_to_uvs[edge_key].add(uv_edge)
-        
-        # 清除所有锐边
-        for edge in mesh.edges:
-            edge.use_edge_sharp = False
-        
-        # 检查并标记UV边界
-        for edge in mesh.edges:
-            edge_key = tuple(sorted((edge.vertices[0], edge.vertices[1])))
-            if edge_key in edge_to_uvs:
-                # 如果一条边在UV空间中有多个不同的位置，它就是UV边界
-                if len(edge_to_uvs[edge_key]) > 1:
-                    edge.use_edge_sharp = True
-        
-        # 切换回编辑模式
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        # 恢复原始模式
-        if current_mode != 'EDIT':
-            bpy.ops.object.mode_set(mode=current_mode)
-        
+
+        utils_mesh.split_estimates.clear()
+        verts = 0
+        split_verts = 0
+        for obj in objects:
+            utils_mesh.sync(obj)
+            estimate = utils_mesh.estimate_vertex_splits(obj.data)
+            utils_mesh.split_estimates[obj.name] = estimate
+            verts += estimate.verts
+            split_verts += estimate.split_verts
+
+        elapsed = (time.perf_counter() - start) * 1000
+        ratio = split_verts / verts if verts else 1.0
+        self.report({'INFO'}, f"{len(objects)} 个网格：{verts} -> {split_verts} 个顶点 (x{ratio:.2f})，用时 {elapsed:.1f}ms")
         return {'FINISHED'}
 
 def register():
     bpy.utils.register_class(MESH_OT_smooth_selected_faces)
     bpy.utils.register_class(MESH_OT_mark_sharp_by_angle)
+    bpy.utils.register_class(MESH_OT_apply_sharp_angle)
     bpy.utils.register_class(MESH_OT_sharp_to_seam)
     bpy.utils.register_class(MESH_OT_uv_boundary_to_sharp)
+    bpy.utils.register_class(MESH_OT_seams_from_uv_islands)
+    bpy.utils.register_class(MESH_OT_estimate_vertex_splits)
 
 def unregister():
+    if bpy.app.timers.is_registered(apply_sharp_angle_later):
+        bpy.app.timers.unregister(apply_sharp_angle_later)
     bpy.utils.unregister_class(MESH_OT_smooth_selected_faces)
     bpy.utils.unregister_class(MESH_OT_mark_sharp_by_angle)
+    bpy.utils.unregister_class(MESH_OT_apply_sharp_angle)
     bpy.utils.unregister_class(MESH_OT_sharp_to_seam)
     bpy.utils.unregister_class(MESH_OT_uv_boundary_to_sharp)
+    bpy.utils.unregister_class(MESH_OT_seams_from_uv_islands)
+    bpy.utils.unregister_class(MESH_OT_estimate_vertex_splits)
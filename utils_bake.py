@@ -1,7 +1,137 @@
 import bpy
 import os
+import time
+import hashlib
+import tempfile
 import numpy as np
+from operator import attrgetter
 from . import utils_color
+from . import utils_mesh
+
+# 按优先级探测的 GPU 后端
+GPU_BACKENDS = ('OPTIX', 'CUDA', 'HIP', 'METAL', 'ONEAPI')
+
+class BakeDevice:
+    """烘焙使用的 Cycles 设备及其调优参数"""
+    def __init__(self, device='CPU', backend='NONE', devices=None, threads=0, tile_size=2048, denoiser='OPENIMAGEDENOISE'):
+        self.device = device
+        self.backend = backend
+        self.devices = devices or []
+        self.threads = threads
+        self.tile_size = tile_size
+        self.denoiser = denoiser
+
+    def summary(self):
+        if self.device == 'GPU':
+            return f"GPU {self.backend}: {', '.join(self.devices)}"
+        return f"CPU {self.threads} 线程, 分块 {self.tile_size}, 降噪 {self.denoiser}"
+
+def _cycles_preferences(context):
+    addon = context.preferences.addons.get('cycles')
+    return addon.preferences if addon else None
+
+def _refresh_devices(cycles_preferences):
+    if hasattr(cycles_preferences, 'refresh_devices'):
+        cycles_preferences.refresh_devices()
+    else:
+        cycles_preferences.get_devices()
+
+def save_device_preferences(context):
+    """记录用户的 Cycles 设备偏好：计算设备类型和各设备的启用状态"""
+    cycles_preferences = _cycles_preferences(context)
+    if cycles_preferences is None:
+        return None
+    return cycles_preferences.compute_device_type, {device.id: device.use for device in cycles_preferences.devices}
+
+def restore_device_preferences(context, state):
+    """恢复 save_device_preferences 记录的偏好，探测和烘焙不改写用户设置"""
+    cycles_preferences = _cycles_preferences(context)
+    if state is None or cycles_preferences is None:
+        return
+    device_type, uses = state
+    cycles_preferences.compute_device_type = device_type
+    _refresh_devices(cycles_preferences)
+    for device in cycles_preferences.devices:
+        if device.id in uses:
+            device.use = uses[device.id]
+
+def detect_device(context, prefer=None):
+    """探测可用的 Cycles 设备：依次尝试各 GPU 后端，都没有时使用调优过的 CPU
+
+    prefer 或环境变量 CC_BAKE_DEVICE 为 'CPU' 时直接使用 CPU（渲染农场节点），
+    CC_BAKE_THREADS 指定 CPU 线程数（并行烘焙时每个进程分到的核心数）"""
+    prefer = prefer or os.environ.get('CC_BAKE_DEVICE', 'AUTO')
+    threads = int(os.environ.get('CC_BAKE_THREADS', 0)) or os.cpu_count() or 1
+    cycles_preferences = _cycles_preferences(context)
+    if prefer != 'CPU' and cycles_preferences is not None:
+        state = save_device_preferences(context)
+        try:
+            for backend in GPU_BACKENDS:
+                try:
+                    cycles_preferences.compute_device_type = backend
+                except TypeError:
+                    # 当前平台/版本不支持该后端
+                    continue
+                _refresh_devices(cycles_preferences)
+                gpus = [device.name for device in cycles_preferences.devices if device.type == backend]
+                if gpus:
+                    return BakeDevice('GPU', backend, gpus, tile_size=2048, denoiser='OPTIX' if backend == 'OPTIX' else 'OPENIMAGEDENOISE')
+        finally:
+            restore_device_preferences(context, state)
+    # CPU 上较小的分块更利于多线程负载均衡
+    return BakeDevice('CPU', 'NONE', threads=threads, tile_size=256)
+
+# 烘焙时改写的场景设置：(所属数据路径, 属性名)
+SCENE_SETTINGS = (
+    ('render', 'engine'),
+    ('render', 'threads_mode'),
+    ('render', 'threads'),
+    ('render.bake', 'margin'),
+    ('cycles', 'device'),
+    ('cycles', 'samples'),
+    ('cycles', 'use_auto_tile'),
+    ('cycles', 'tile_size'),
+    ('cycles', 'denoiser'),
+)
+
+def save_scene_settings(scene):
+    """记录烘焙会改写的场景设置"""
+    state = []
+    for path, attr in SCENE_SETTINGS:
+        owner = attrgetter(path)(scene)
+        state.append((path, attr, getattr(owner, attr)))
+    return state
+
+def restore_scene_settings(scene, state):
+    # 先恢复渲染引擎以外的设置，最后切回原来的引擎
+    for path, attr, value in reversed(state or ()):
+        setattr(attrgetter(path)(scene), attr, value)
+
+def apply_device(context, device):
+    """把设备配置写入场景和 Cycles 偏好设置，返回修改前的场景设置
+
+    场景设置交给 restore_scene_settings、偏好设置交给 restore_device_preferences，由调用者在烘焙后恢复"""
+    scene = context.scene
+    previous = save_scene_settings(scene)
+    scene.render.engine = 'CYCLES'
+    cycles = scene.cycles
+    cycles_preferences = _cycles_preferences(context)
+
+    if device.device == 'GPU' and cycles_preferences is not None:
+        cycles_preferences.compute_device_type = device.backend
+        # 只启用该后端的GPU设备
+        for item in cycles_preferences.devices:
+            item.use = item.type == device.backend
+        cycles.device = 'GPU'
+    else:
+        cycles.device = 'CPU'
+        scene.render.threads_mode = 'FIXED'
+        scene.render.threads = device.threads
+
+    cycles.use_auto_tile = True
+    cycles.tile_size = device.tile_size
+    cycles.denoiser = device.denoiser
+    return previous
 
 class BakeSettings:
     def __init__(self):
@@ -9,20 +139,702 @@ class BakeSettings:
         self.samples = 128
         self.margin = 16
         self.bake_type = 'COMBINED'
-        
+        self.single_pass = True
+        self.use_cache = True
+        # 输出图像的存储精度：'FLOAT'、'HALF' 或 'BYTE'
+        self.precision = 'FLOAT'
+        # None 时在 apply 中自动探测
+        self.device = None
+        # apply 之前的 Cycles 设备偏好和场景设置，烘焙结束后由 restore 恢复
+        self.saved_preferences = None
+        self.saved_scene = None
+        # 本次烘焙的场景指纹，由 prepare_cache 计算一次
+        self.scene_hash = None
+        # 各阶段累计耗时（秒）
+        self.timings = {}
+        # 每个物体烘焙时缓冲区的峰值内存（字节）
+        self.peaks = {}
+
+    @classmethod
+    def from_scene(cls, scene, **overrides):
+        """使用面板上的烘焙设置"""
+        settings = cls()
+        settings.resolution = int(scene.bake_resolution)
+        settings.samples = scene.bake_samples
+        settings.margin = scene.bake_margin
+        settings.bake_type = scene.bake_type
+        settings.precision = scene.bake_precision
+        for key, value in overrides.items():
+            setattr(settings, key, value)
+        return settings
+
+    def to_dict(self):
+        """传给后台烘焙进程的参数（设备由进程自己探测）"""
+        return {
+            'resolution': self.resolution,
+            'samples': self.samples,
+            'margin': self.margin,
+            'bake_type': self.bake_type,
+            'single_pass': self.single_pass,
+            'use_cache': self.use_cache,
+            'precision': self.precision,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        settings = cls()
+        for key, value in data.items():
+            setattr(settings, key, value)
+        return settings
+
+    def add_timing(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def report_timings(self):
+        return ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+
+    def report_memory(self):
+        if not self.peaks:
+            return "峰值内存 0MB"
+        return f"峰值内存 {max(self.peaks.values()) / 1024 ** 2:.0f}MB"
+
     def apply(self, context):
-        context.scene.render.engine = 'CYCLES'
+        if self.device is None:
+            self.device = detect_device(context)
+        self.saved_preferences = save_device_preferences(context)
+        self.saved_scene = apply_device(context, self.device)
         context.scene.cycles.samples = self.samples
         context.scene.render.bake.margin = self.margin
+
+    def prepare_cache(self, context):
+        """批量烘焙前计算一次场景指纹，各物体的缓存键共用"""
+        self.scene_hash = None
+        if self.use_cache:
+            self.scene_hash = scene_fingerprint(context.scene, context.evaluated_depsgraph_get())
+
+    def restore(self, context):
+        restore_scene_settings(context.scene, self.saved_scene)
+        restore_device_preferences(context, self.saved_preferences)
+        self.saved_scene = None
+        self.saved_preferences = None
+
+    def report(self):
+        """记录本次烘焙实际使用的设备和参数"""
+        device = self.device.summary() if self.device else "未设置"
+        return f"{self.resolution}px {self.precision}, {self.samples} 采样, 边缘 {self.margin}, {device}"
         
-def bake_textures(context, settings):
-    # ... 烘焙实现代码 ...
-    pass
+def _hash_value(h, value):
+    h.update(repr(value).encode())
+
+def _hash_array(h, collection, attr, dtype, count, width=1):
+    h.update(utils_mesh.read_array(collection, attr, dtype, count, width).tobytes())
+
+def _hash_node_tree(h, node_tree):
+    """节点树中影响结果的部分：节点类型、输入默认值、图像和连接"""
+    if node_tree is None:
+        return
+    for node in node_tree.nodes:
+        _hash_value(h, (node.bl_idname, node.name))
+        for socket in node.inputs:
+            if hasattr(socket, 'default_value'):
+                value = socket.default_value
+                _hash_value(h, tuple(value) if hasattr(value, '__len__') else value)
+        image = getattr(node, 'image', None)
+        if image is not None:
+            _hash_value(h, (image.name, image.filepath))
+    for link in node_tree.links:
+        _hash_value(h, (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier))
+
+def _hash_scene_geometry(h, depsgraph):
+    """AO 和间接光受周围几何影响：所有可渲染网格实例的变换和修改器后的顶点"""
+    meshes = {}
+    instances = []
+    for instance in depsgraph.object_instances:
+        ob = instance.object
+        if ob.type != 'MESH' or ob.original.hide_render:
+            continue
+        mesh = ob.data
+        # 同一网格的多个实例只读取一次顶点
+        if mesh.name not in meshes:
+            g = hashlib.blake2b(digest_size=16)
+            _hash_array(g, mesh.vertices, 'co', np.float32, len(mesh.vertices), 3)
+            meshes[mesh.name] = g.hexdigest()
+        instances.append((ob.name, meshes[mesh.name], [tuple(row) for row in instance.matrix_world]))
+    _hash_value(h, sorted(instances))
+
+def _hash_scene_materials(h, depsgraph):
+    """其他物体的材质影响 AO 和间接光：每个可渲染网格的材质槽和材质节点树"""
+    materials = {}
+    slots = set()
+    for instance in depsgraph.object_instances:
+        ob = instance.object.original
+        if ob.type != 'MESH' or ob.hide_render:
+            continue
+        names = []
+        for slot in ob.material_slots:
+            mat = slot.material
+            if mat is None:
+                names.append(None)
+                continue
+            if mat.name not in materials:
+                g = hashlib.blake2b(digest_size=16)
+                _hash_value(g, (tuple(mat.diffuse_color), mat.use_nodes))
+                _hash_node_tree(g, mat.node_tree if mat.use_nodes else None)
+                materials[mat.name] = g.hexdigest()
+            names.append(mat.name)
+        slots.add((ob.name, tuple(names)))
+    _hash_value(h, sorted(slots, key=repr))
+    _hash_value(h, sorted(materials.items()))
+
+def scene_fingerprint(scene, depsgraph):
+    """烘焙物体以外的输入的指纹：周围几何、材质、灯光和世界环境
+
+    与物体无关，每次烘焙只计算一次，再传给各物体的 bake_key"""
+    h = hashlib.blake2b(digest_size=20)
+    _hash_scene_geometry(h, depsgraph)
+    _hash_scene_materials(h, depsgraph)
+
+    for light in scene.objects:
+        if light.type != 'LIGHT' or light.hide_render:
+            continue
+        data = light.data
+        _hash_value(h, (data.type, tuple(data.color), data.energy, getattr(data, 'shadow_soft_size', 0.0),
+                        getattr(data, 'spot_size', 0.0), getattr(data, 'angle', 0.0), getattr(data, 'size', 0.0)))
+        _hash_value(h, [tuple(row) for row in light.matrix_world])
+
+    world = scene.world
+    if world is not None:
+        _hash_value(h, (tuple(world.color), world.light_settings.distance))
+        _hash_node_tree(h, world.node_tree if world.use_nodes else None)
+    return h.hexdigest()
+
+def bake_key(obj, scene, options, uv_index=1, depsgraph=None, scene_hash=None):
+    """影响烘焙结果的所有输入的指纹：修改器后的网格、第二UV、场景指纹和烘焙参数
+
+    scene_hash 为 scene_fingerprint 的结果，批量烘焙时只计算一次"""
+    h = hashlib.blake2b(digest_size=20)
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+    # Cycles 烘焙的是应用修改器后的网格
+    mesh = obj.evaluated_get(depsgraph).data
+    _hash_array(h, mesh.vertices, 'co', np.float32, len(mesh.vertices), 3)
+    _hash_array(h, mesh.polygons, 'loop_total', np.int32, len(mesh.polygons))
+    _hash_array(h, mesh.loops, 'vertex_index', np.int32, len(mesh.loops))
+    if len(mesh.uv_layers) > uv_index:
+        _hash_array(h, mesh.uv_layers[uv_index].data, 'uv', np.float32, len(mesh.loops), 2)
+    _hash_value(h, [tuple(row) for row in obj.matrix_world])
+    _hash_value(h, scene_hash or scene_fingerprint(scene, depsgraph))
+    _hash_value(h, options)
+    return h.hexdigest()
+
+def file_format(image):
+    """浮点图像保存为 EXR，8位图像保存为 PNG（像素值原样保存，不做颜色空间转换）"""
+    return ('OPEN_EXR', '.exr') if image.is_float else ('PNG', '.png')
+
+def save_image(image, path):
+    """把图像像素保存到 path，原图像保持为生成的图像
+
+    image.copy() 不复制内存中生成的像素，因此新建同格式的图像并写入像素后保存；
+    先写临时文件再改名，其他进程不会读到写了一半的文件"""
+    width, height = image.size
+    saved = bpy.data.images.new(
+        name=f"{image.name}_save",
+        width=width,
+        height=height,
+        alpha=False,
+        float_buffer=image.is_float
+    )
+    partial = f"{path}.{os.getpid()}.part"
+    try:
+        saved.colorspace_settings.name = image.colorspace_settings.name
+        saved.use_half_precision = image.use_half_precision
+        utils_color.write_pixels(saved, utils_color.read_pixels(image))
+        saved.filepath_raw = partial
+        saved.file_format = file_format(image)[0]
+        saved.save()
+        os.replace(partial, path)
+    finally:
+        bpy.data.images.remove(saved)
+        if os.path.exists(partial):
+            os.remove(partial)
+
+def load_image(path, image):
+    """读取文件的像素写入 image，尺寸或通道数不同时返回 False"""
+    loaded = bpy.data.images.load(path, check_existing=False)
+    try:
+        if tuple(loaded.size) != tuple(image.size):
+            return False
+        pixels = utils_color.read_pixels(loaded)
+        if loaded.channels != image.channels:
+            return False
+        utils_color.write_pixels(image, pixels)
+    finally:
+        bpy.data.images.remove(loaded)
+    return True
+
+def default_cache_directory():
+    return os.environ.get('CC_BAKE_CACHE') or os.path.join(tempfile.gettempdir(), 'cc_bake_cache')
+
+class BakeCache:
+    """以输入指纹为键保存烘焙结果（浮点为 EXR，8位为 PNG）；总大小超过上限时按最近使用时间淘汰"""
+    def __init__(self, directory=None, max_bytes=4 * 1024 ** 3):
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = max_bytes
+
+    def path(self, key, image):
+        return os.path.join(self.directory, key + file_format(image)[1])
+
+    def load(self, key, image):
+        """命中时把缓存的像素写入 image 并返回 True"""
+        path = self.path(key, image)
+        try:
+            if not os.path.isfile(path) or not load_image(path, image):
+                return False
+            # 更新使用时间，供LRU淘汰
+            os.utime(path)
+        except (RuntimeError, FileNotFoundError):
+            # 读取前已被其他进程淘汰
+            return False
+        return True
+
+    def store(self, key, image):
+        os.makedirs(self.directory, exist_ok=True)
+        save_image(image, self.path(key, image))
+        self.evict()
+
+    def evict(self):
+        """并行烘焙的各进程共用缓存目录，文件可能已被其他进程删除"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(('.exr', '.png')):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+bake_cache = BakeCache()
+
+# 打包贴图中可以由临时着色器在一次烘焙里直接输出的来源
+SHADER_PASSES = {'AO', 'LIGHT'}
+
+def can_route_in_shader(spec):
+    """spec 的 RGB 通道只含 AO、常数和最多一个光照通道，且 Alpha 为 1 时可以一次烘焙"""
+    passes = [source for source in spec[:3] if isinstance(source, str)]
+    if any(source not in SHADER_PASSES for source in passes):
+        return False
+    if passes.count('LIGHT') > 1:
+        return False
+    return len(spec) < 4 or spec[3] == 1.0
+
+def setup_packed_shader(mat, image, spec, ao_distance=1.0):
+    """构建临时着色器：AO和常数经自发光写入各自通道，光照经单通道反照率的漫反射写入所在通道
+
+    反照率只在光照通道为1，其余通道的漫反射贡献为0，自发光也只落在自己的通道，
+    因此一次 COMBINED 烘焙即得到打包好的 RGB"""
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    nodes.clear()
+
+    output_node = nodes.new('ShaderNodeOutputMaterial')
+    add_shader = nodes.new('ShaderNodeAddShader')
+    emission = nodes.new('ShaderNodeEmission')
+    diffuse = nodes.new('ShaderNodeBsdfDiffuse')
+    combine = nodes.new('ShaderNodeCombineColor')
+    ao = nodes.new('ShaderNodeAmbientOcclusion')
+    image_node = nodes.new('ShaderNodeTexImage')
+
+    output_node.location = (400, 0)
+    add_shader.location = (200, 0)
+    emission.location = (0, 100)
+    diffuse.location = (0, -100)
+    combine.location = (-200, 100)
+    ao.location = (-400, 100)
+    image_node.location = (-400, -200)
+
+    ao.inputs['Distance'].default_value = ao_distance
+    albedo = [0.0, 0.0, 0.0, 1.0]
+    for index, source in enumerate(spec[:3]):
+        if source == 'LIGHT':
+            albedo[index] = 1.0
+        elif source == 'AO':
+            links.new(ao.outputs['AO'], combine.inputs[index])
+        else:
+            combine.inputs[index].default_value = float(source)
+    diffuse.inputs['Color'].default_value = albedo
+
+    links.new(combine.outputs[0], emission.inputs['Color'])
+    links.new(emission.outputs[0], add_shader.inputs[0])
+    links.new(diffuse.outputs[0], add_shader.inputs[1])
+    links.new(add_shader.outputs[0], output_node.inputs['Surface'])
+
+    # 烘焙目标为活动的图像节点
+    image_node.image = image
+    image_node.select = True
+    nodes.active = image_node
+    return image_node
+
+def bake_packed(margin):
+    """一次 COMBINED 烘焙：自发光 + 漫反射的直接与间接光照（含反照率）"""
+    bpy.ops.object.bake(
+        type='COMBINED',
+        pass_filter={'EMIT', 'DIRECT', 'INDIRECT', 'DIFFUSE', 'COLOR'},
+        use_clear=True,
+        margin=margin
+    )
+
+class BakeStage:
+    """流水线中的一次 Cycles 烘焙：烘焙类型和 pass_filter"""
+    def __init__(self, name, bake_type, pass_filter=None):
+        self.name = name
+        self.bake_type = bake_type
+        self.pass_filter = pass_filter
+
+    def bake(self, margin):
+        kwargs = {'pass_filter': self.pass_filter} if self.pass_filter else {}
+        bpy.ops.object.bake(type=self.bake_type, use_clear=True, margin=margin, **kwargs)
+
+STAGES = {
+    'AO': BakeStage('AO', 'AO'),
+    'LIGHT': BakeStage('LIGHT', 'DIFFUSE', {'DIRECT', 'INDIRECT', 'EMIT'}),
+    'SHADOW': BakeStage('SHADOW', 'SHADOW'),
+    'NORMAL': BakeStage('NORMAL', 'NORMAL'),
+}
+
+# 每种输出的通道来源：常数或阶段名；COMBINED 为 R:黑色, G:AO, B:光照, A:1
+OUTPUTS = {
+    'COMBINED': [0.0, 'AO', 'LIGHT', 1.0],
+    'AO': ['AO'],
+    'LIGHT': ['LIGHT'],
+    'SHADOW': ['SHADOW'],
+    'NORMAL': ['NORMAL'],
+}
+
+# 输出图像名后缀，预览操作符按名称查找
+OUTPUT_SUFFIX = {
+    'COMBINED': 'combined',
+    'AO': 'ao',
+    'LIGHT': 'lighting',
+    'SHADOW': 'shadow',
+    'NORMAL': 'normal',
+}
+
+def get_material(obj):
+    """物体独占的烘焙材质：没有时创建，与其他物体共用时复制一份
+
+    烘焙和显示结果都会重建第一个材质的节点，共用材质会让其他物体显示这个物体的贴图"""
+    if not obj.material_slots:
+        obj.data.materials.append(None)
+    slot = obj.material_slots[0]
+    mat = slot.material
+    if mat is None:
+        mat = bpy.data.materials.new(name=f"{obj.name}_bake_material")
+    elif shares_material(obj, mat):
+        mat = mat.copy()
+        mat.name = f"{obj.name}_bake_material"
+    else:
+        return mat
+    mat.use_nodes = True
+    # 链接到物体，共用网格数据的其他物体保持原材质
+    slot.link = 'OBJECT'
+    slot.material = mat
+    return mat
+
+def shares_material(obj, mat):
+    """材质是否还被其他物体使用（包括共用网格数据的物体）"""
+    for other in bpy.data.objects:
+        if other is not obj and any(slot.material == mat for slot in other.material_slots):
+            return True
+    return False
+
+def setup_bake_nodes(mat, image):
+    """白色漫反射加活动图像节点；各阶段只切换图像节点的目标图像"""
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    nodes.clear()
+
+    output_node = nodes.new('ShaderNodeOutputMaterial')
+    diffuse = nodes.new('ShaderNodeBsdfDiffuse')
+    image_node = nodes.new('ShaderNodeTexImage')
+
+    output_node.location = (300, 0)
+    diffuse.location = (-100, 0)
+    image_node.location = (-300, 0)
+
+    links.new(diffuse.outputs[0], output_node.inputs['Surface'])
+
+    # 烘焙目标为活动的图像节点
+    image_node.image = image
+    image_node.select = True
+    nodes.active = image_node
+    return image_node
+
+def assign_result(obj, image, uv_index=1):
+    """材质改为使用烘焙结果（第二UV）"""
+    mat = get_material(obj)
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    nodes.clear()
+
+    output_node = nodes.new('ShaderNodeOutputMaterial')
+    principled_bsdf = nodes.new('ShaderNodeBsdfPrincipled')
+    image_node = nodes.new('ShaderNodeTexImage')
+    uv_node = nodes.new('ShaderNodeUVMap')
+
+    output_node.location = (300, 0)
+    principled_bsdf.location = (0, 0)
+    image_node.location = (-300, 0)
+    uv_node.location = (-500, 0)
+
+    image_node.image = image
+    uv_node.uv_map = obj.data.uv_layers[uv_index].name
+
+    links.new(uv_node.outputs[0], image_node.inputs[0])
+    links.new(image_node.outputs[0], principled_bsdf.inputs[0])
+    links.new(principled_bsdf.outputs[0], output_node.inputs[0])
+
+def image_bytes(image):
+    """图像像素在内存中的大小：浮点每通道4字节，8位每通道1字节"""
+    width, height = image.size
+    return width * height * image.channels * (4 if image.is_float else 1)
+
+def new_image(name, resolution, precision='FLOAT', non_color=False):
+    """按名称获取图像，尺寸或存储精度不同时重新创建
+
+    'HALF' 在内存中仍为32位浮点，渲染时按16位载入，保存的 EXR 也为16位"""
+    float_buffer = precision != 'BYTE'
+    image = bpy.data.images.get(name)
+    if image is not None and (tuple(image.size) != (resolution, resolution) or image.is_float != float_buffer):
+        bpy.data.images.remove(image)
+        image = None
+    if image is None:
+        image = bpy.data.images.new(
+            name=name,
+            width=resolution,
+            height=resolution,
+            alpha=False,
+            float_buffer=float_buffer
+        )
+    image.use_half_precision = precision == 'HALF'
+    if non_color:
+        image.colorspace_settings.name = 'Non-Color'
+    return image
+
+# 输出图像的存储精度
+PRECISIONS = [
+    ('FLOAT', "32位浮点", "完整精度，每像素16字节"),
+    ('HALF', "16位浮点", "渲染时按16位载入，缓存和输出文件减半"),
+    ('BYTE', "8位 sRGB", "每像素4字节，量化时加抖动避免色带"),
+]
+
+# 数据贴图，8位保存时不做 sRGB 编码
+NON_COLOR_OUTPUTS = {'NORMAL'}
+
+def output_image(obj, settings):
+    return new_image(f"{obj.name}_{OUTPUT_SUFFIX[settings.bake_type]}", settings.resolution,
+                     settings.precision, settings.bake_type in NON_COLOR_OUTPUTS)
+
+class BakeMemory:
+    """统计一次烘焙中图像和像素数组占用的内存，记录峰值"""
+    def __init__(self):
+        self.live = {}
+        self.peak = 0
+
+    def allocate(self, name, nbytes):
+        self.live[name] = nbytes
+        self.peak = max(self.peak, sum(self.live.values()))
+
+    def free(self, name):
+        self.live.pop(name, None)
+
+class BakeBuffers:
+    """8位输出烘焙时使用的32位中间图像，读出像素后立即释放"""
+    def __init__(self, memory):
+        self.memory = memory
+        self.names = {}
+
+    def get(self, stage, resolution):
+        name = f"cc_bake_{stage.lower()}_{resolution}"
+        self.names[stage] = name
+        image = new_image(name, resolution)
+        self.memory.allocate(name, image_bytes(image))
+        return image
+
+    def release(self, stage):
+        name = self.names.pop(stage, None)
+        image = bpy.data.images.get(name) if name else None
+        if image is not None:
+            bpy.data.images.remove(image)
+        self.memory.free(name)
+
+    def clear(self):
+        for stage in list(self.names):
+            self.release(stage)
+
+def check_object(obj, uv_index=1):
+    """不能烘焙时返回错误信息"""
+    if obj is None or obj.type != 'MESH':
+        return "请选择一个物体"
+    # 检查是否有第二UV图层
+    if len(obj.data.uv_layers) <= uv_index:
+        return "物体需要第二UV图层"
+    return None
+
+def run_stages(obj, settings, image, memory):
+    """按输出声明烘焙所需阶段，材质只设置一次，最后写入 image
+
+    浮点输出的各阶段直接烘焙到 image，读出所需通道后再烘焙下一阶段，不分配中间图像；
+    8位输出共用一张浮点中间图像，量化时只对烘焙得到的颜色通道做 sRGB 编码和抖动"""
+    spec = OUTPUTS[settings.bake_type]
+    names = list(dict.fromkeys(source for source in spec if isinstance(source, str)))
+    buffers = BakeBuffers(memory)
+    memory.allocate('output', image_bytes(image))
+    # 8位图像不能直接作为烘焙目标
+    target = image if image.is_float else buffers.get('STAGE', settings.resolution)
+
+    start = time.perf_counter()
+    mat = get_material(obj)
+    try:
+        if settings.single_pass and len(spec) == 4 and can_route_in_shader(spec):
+            # 单次烘焙：临时着色器直接输出打包后的通道
+            scene = bpy.context.scene
+            ao_distance = scene.world.light_settings.distance if scene.world else 1.0
+            setup_packed_shader(mat, target, spec, ao_distance)
+            settings.add_timing('setup', time.perf_counter() - start)
+            start = time.perf_counter()
+            bake_packed(settings.margin)
+            settings.add_timing('PACKED', time.perf_counter() - start)
+            stages = []
+            whole = True
+        else:
+            setup_bake_nodes(mat, target)
+            settings.add_timing('setup', time.perf_counter() - start)
+            stages = names
+            # 单一阶段时整张烘焙图像就是输出
+            whole = len(spec) == 1
+
+        if whole and target is image:
+            for name in stages:
+                start = time.perf_counter()
+                STAGES[name].bake(settings.margin)
+                settings.add_timing(name, time.perf_counter() - start)
+            return
+
+        # 打包数组兼作读取缓冲，每个阶段只保留所需的单个通道
+        packed = np.empty((image.size[0] * image.size[1], image.channels), dtype=np.float32)
+        memory.allocate('packed', packed.nbytes)
+        columns = {}
+        for name in stages:
+            start = time.perf_counter()
+            STAGES[name].bake(settings.margin)
+            settings.add_timing(name, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            utils_color.read_pixels(target, packed)
+            if not whole:
+                columns[name] = packed[:, 0].copy()
+                memory.allocate(name, columns[name].nbytes)
+            settings.add_timing('pack', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        if whole:
+            if not stages:
+                utils_color.read_pixels(target, packed)
+            channels = None if len(spec) == 1 else [i for i, source in enumerate(spec[:3]) if isinstance(source, str)]
+        else:
+            for index, source in enumerate(spec[:image.channels]):
+                packed[:, index] = columns[source] if isinstance(source, str) else source
+            for name in columns:
+                memory.free(name)
+            columns.clear()
+            channels = [i for i, source in enumerate(spec[:3]) if isinstance(source, str)]
+        buffers.clear()
+        utils_color.quantize(packed, settings.precision, srgb=settings.bake_type not in NON_COLOR_OUTPUTS,
+                             channels=channels)
+        utils_color.write_pixels(image, packed)
+        settings.add_timing('pack', time.perf_counter() - start)
+    finally:
+        buffers.clear()
+
+def bake_object(context, obj, settings, uv_index=1):
+    """烘焙一个物体，返回 (图像, 是否来自缓存)；各烘焙操作符和后台进程共用"""
+    # 烘焙作用于选中的活动物体
+    for other in context.view_layer.objects.selected:
+        other.select_set(False)
+    obj.select_set(True)
+    context.view_layer.objects.active = obj
+
+    # 存储当前活动的UV图层，设置烘焙UV图层为活动图层
+    active_uv = obj.data.uv_layers.active
+    obj.data.uv_layers.active = obj.data.uv_layers[uv_index]
+
+    image = output_image(obj, settings)
+    try:
+        # 网格、烘焙UV、灯光、世界和参数都未变时直接读取缓存
+        key = None
+        if settings.use_cache:
+            start = time.perf_counter()
+            options = (settings.resolution, settings.samples, settings.margin, settings.bake_type,
+                       OUTPUTS[settings.bake_type], settings.single_pass, settings.precision)
+            key = bake_key(obj, context.scene, options, uv_index, context.evaluated_depsgraph_get(), settings.scene_hash)
+            hit = bake_cache.load(key, image)
+            settings.add_timing('cache', time.perf_counter() - start)
+            if hit:
+                assign_result(obj, image, uv_index)
+                return image, True
+
+        memory = BakeMemory()
+        run_stages(obj, settings, image, memory)
+        settings.peaks[obj.name] = memory.peak
+
+        if key is not None:
+            start = time.perf_counter()
+            bake_cache.store(key, image)
+            settings.add_timing('cache', time.perf_counter() - start)
+    finally:
+        # 烘焙完成后恢复原来的UV图层
+        obj.data.uv_layers.active = active_uv
+
+    assign_result(obj, image, uv_index)
+    return image, False
+
+def bake_textures(context, settings, objects=None):
+    """烘焙选中的网格物体，返回 [(物体, 图像, 是否来自缓存)]；没有可烘焙物体时抛出 ValueError"""
+    if objects is None:
+        objects = [obj for obj in context.selected_objects if check_object(obj) is None]
+    if not objects:
+        raise ValueError("没有可烘焙的物体（需要第二UV图层）")
 
-def create_bake_materials():
-    # ... 材质创建代码 ...
-    pass
+    settings.timings.clear()
+    settings.peaks.clear()
+    # bake_object 会改变选择和活动物体，结束后恢复
+    view_layer = context.view_layer
+    selected = list(context.selected_objects)
+    active = view_layer.objects.active
+    settings.apply(context)
+    results = []
+    try:
+        settings.prepare_cache(context)
+        for obj in objects:
+            image, cached = bake_object(context, obj, settings)
+            results.append((obj, image, cached))
+    finally:
+        settings.restore(context)
+        restore_selection(view_layer, selected, active)
+    return results
 
-def setup_bake_nodes():
-    # ... 节点设置代码 ...
-    pass
+def restore_selection(view_layer, selected, active):
+    for obj in view_layer.objects.selected:
+        obj.select_set(False)
+    for obj in selected:
+        obj.select_set(True)
+    view_layer.objects.active = active
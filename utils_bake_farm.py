@@ -0,0 +1,133 @@
+import bpy
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from . import utils_bake
+
+# 后台进程执行的脚本，与插件在同一目录
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bake_worker.py")
+
+# 每个 CPU 进程至少分到的线程数，线程太少时 BVH 构建等开销占比过高
+MIN_WORKER_THREADS = 4
+
+def split_jobs(items, weights, count):
+    """按权重（面数）贪心分配：每次把最重的物体交给当前最轻的分组"""
+    slices = [[] for _ in range(count)]
+    loads = [0] * count
+    for index in sorted(range(len(items)), key=lambda i: -weights[i]):
+        target = loads.index(min(loads))
+        slices[target].append(items[index])
+        loads[target] += weights[index]
+    return [job for job in slices if job]
+
+class BakeFarm:
+    """把物体分给多个后台 Blender 进程烘焙：保存临时副本，启动进程，统计进度，收集结果"""
+    def __init__(self, objects, settings, workers=0):
+        self.names = [obj.name for obj in objects]
+        self.weights = [max(1, len(obj.data.polygons)) for obj in objects]
+        self.settings = settings
+        self.device = settings.device or utils_bake.detect_device(bpy.context)
+        cores = os.cpu_count() or 1
+        if not workers:
+            # GPU 只有一块时多进程会互相争抢，CPU 按核心数分组
+            workers = 1 if self.device.device == 'GPU' else max(1, cores // MIN_WORKER_THREADS)
+        self.worker_count = max(1, min(workers, len(self.names)))
+        self.threads = max(1, cores // self.worker_count)
+        self.directory = None
+        self.processes = []
+        self.start_time = 0.0
+        self.end_time = None
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix="cc_bake_farm_")
+        blend = os.path.join(self.directory, "farm.blend")
+        # 保存副本，不改变当前文件的路径和已保存状态
+        bpy.ops.wm.save_as_mainfile(filepath=blend, copy=True)
+
+        env = dict(os.environ)
+        if self.device.device == 'CPU':
+            env['CC_BAKE_DEVICE'] = 'CPU'
+            env['CC_BAKE_THREADS'] = str(self.threads)
+
+        items = list(enumerate(self.names))
+        self.start_time = time.perf_counter()
+        for worker, job in enumerate(split_jobs(items, self.weights, self.worker_count)):
+            job_path = os.path.join(self.directory, f"job_{worker}.json")
+            with open(job_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'objects': job,
+                    'settings': self.settings.to_dict(),
+                    'output': self.directory,
+                    'progress': os.path.join(self.directory, f"done_{worker}.txt"),
+                }, f)
+            log = open(os.path.join(self.directory, f"worker_{worker}.log"), 'w', encoding='utf-8')
+            self.processes.append(subprocess.Popen(
+                [bpy.app.binary_path, "--background", "-noaudio", blend,
+                 "--python", WORKER_SCRIPT, "--", job_path],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env
+            ))
+            log.close()
+
+    def running(self):
+        running = any(process.poll() is None for process in self.processes)
+        if not running and self.end_time is None:
+            self.end_time = time.perf_counter()
+        return running
+
+    def poll(self):
+        """已完成的物体数（进程每烘焙完一个物体追加一行进度）"""
+        done = 0
+        for worker in range(len(self.processes)):
+            path = os.path.join(self.directory, f"done_{worker}.txt")
+            if os.path.isfile(path):
+                with open(path, encoding='utf-8') as f:
+                    done += sum(1 for _ in f)
+        return done
+
+    def elapsed(self):
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        return end - self.start_time
+
+    def result_path(self, index, image):
+        return os.path.join(self.directory, str(index) + utils_bake.file_format(image)[1])
+
+    def collect(self, context):
+        """把各进程输出的 EXR 读入当前文件，返回 (成功数量, 失败的物体名)"""
+        collected = 0
+        failed = []
+        for index, name in enumerate(self.names):
+            obj = bpy.data.objects.get(name)
+            if obj is None:
+                failed.append(name)
+                continue
+            image = utils_bake.output_image(obj, self.settings)
+            path = self.result_path(index, image)
+            if not os.path.isfile(path) or not utils_bake.load_image(path, image):
+                failed.append(name)
+                continue
+            utils_bake.assign_result(obj, image)
+            collected += 1
+        return collected, failed
+
+    def cancel(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def cleanup(self):
+        """结束仍在运行的进程并删除临时文件"""
+        self.cancel()
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from mathutils import Vector
 
 
@@ -93,3 +94,91 @@ class BBox:
 				self.ymin = y
 			if y > self.ymax:
 				self.ymax = y
+
+
+
+class BBoxArray:
+	"""N个岛的边界框，xmin/xmax/ymin/ymax 以 numpy 数组按列存储"""
+
+	@classmethod
+	def from_uvs(cls, uvs, offsets):
+		"""uvs 为按岛排序的循环UV (L,2)，offsets 为每个岛的起始下标（长度 N+1）"""
+		starts = np.asarray(offsets[:-1])
+		if not len(starts):
+			return cls(np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0))
+		return cls(
+			np.minimum.reduceat(uvs[:, 0], starts),
+			np.maximum.reduceat(uvs[:, 0], starts),
+			np.minimum.reduceat(uvs[:, 1], starts),
+			np.maximum.reduceat(uvs[:, 1], starts),
+		)
+
+	@classmethod
+	def calc_bbox_uv(cls, islands, uv_layer):
+		"""从 BMesh 读取所有岛的UV，一次计算全部边界框"""
+		uvs = []
+		offsets = [0]
+		for island in islands:
+			for face in island:
+				for loop in face.loops:
+					uvs.extend(loop[uv_layer].uv)
+			offsets.append(len(uvs) // 2)
+		return cls.from_uvs(np.array(uvs, dtype=np.float64).reshape(-1, 2), offsets)
+
+	def __init__(self, xmin, xmax, ymin, ymax):
+		self.xmin = np.asarray(xmin, dtype=np.float64)
+		self.xmax = np.asarray(xmax, dtype=np.float64)
+		self.ymin = np.asarray(ymin, dtype=np.float64)
+		self.ymax = np.asarray(ymax, dtype=np.float64)
+
+	def __len__(self):
+		return len(self.xmin)
+
+	def __getitem__(self, index):
+		if isinstance(index, (int, np.integer)):
+			return BBox(float(self.xmin[index]), float(self.xmax[index]), float(self.ymin[index]), float(self.ymax[index]))
+		return BBoxArray(self.xmin[index], self.xmax[index], self.ymin[index], self.ymax[index])
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+
+	@property
+	def min(self):
+		return np.column_stack((self.xmin, self.ymin))
+
+	@property
+	def max(self):
+		return np.column_stack((self.xmax, self.ymax))
+
+	@property
+	def center(self):
+		"""(N,2) 中心点"""
+		return np.column_stack(((self.xmin + self.xmax) / 2, (self.ymin + self.ymax) / 2))
+
+	@property
+	def width(self):
+		return self.xmax - self.xmin
+
+	@property
+	def height(self):
+		return self.ymax - self.ymin
+
+	@property
+	def max_lenght(self):
+		return np.maximum(self.width, self.height)
+
+	def union(self):
+		"""合并全部边界框"""
+		if not len(self):
+			return BBox()
+		return BBox(float(self.xmin.min()), float(self.xmax.max()), float(self.ymin.min()), float(self.ymax.max()))
+
+	@classmethod
+	def concatenate(cls, arrays):
+		return cls(
+			np.concatenate([a.xmin for a in arrays]),
+			np.concatenate([a.xmax for a in arrays]),
+			np.concatenate([a.ymin for a in arrays]),
+			np.concatenate([a.ymax for a in arrays]),
+		)
@@ -19,3 +19,56 @@ def get_color_from_normal(normal):
 def blend_colors(color1, color2, factor):
     """混合两种颜色"""
     return tuple(c1 * (1 - factor) + c2 * factor for c1, c2 in zip(color1, color2))
+
+def read_pixels(image, out=None):
+    """用 foreach_get 读取图像像素，返回 (像素数, 通道数) 的 float32 数组
+
+    out 大小相同时复用，避免每次读取都分配新的数组"""
+    size = len(image.pixels)
+    if out is None or out.size != size:
+        out = np.empty(size, dtype=np.float32)
+    image.pixels.foreach_get(out.reshape(-1))
+    return out.reshape(-1, image.channels)
+
+def write_pixels(image, pixels):
+    """用 foreach_set 一次写回所有像素"""
+    image.pixels.foreach_set(np.ascontiguousarray(pixels, dtype=np.float32).ravel())
+    image.update()
+
+def linear_to_srgb(values):
+    """线性值转 sRGB 编码（原地）"""
+    np.clip(values, 0.0, 1.0, out=values)
+    low = values <= 0.0031308
+    encoded = 1.055 * np.power(values, 1.0 / 2.4, dtype=np.float32) - 0.055
+    encoded[low] = values[low] * 12.92
+    values[:] = encoded
+    return values
+
+# 量化时分块处理，限制临时数组的大小
+QUANTIZE_CHUNK = 1 << 20
+
+def quantize(pixels, precision, srgb=True, seed=0, channels=None):
+    """按存储精度量化像素（原地）
+
+    'HALF' 舍入到 16 位浮点；'BYTE' 把 channels（默认 RGB）转为 sRGB（srgb 为 True 时），
+    加三角分布抖动后截断到 [0, 1]，写入 8 位图像时不会出现色带。
+    channels 之外的通道（常数和 Alpha）保持不变"""
+    if precision == 'HALF':
+        pixels[:] = pixels.astype(np.float16)
+    elif precision == 'BYTE':
+        if channels is None:
+            channels = list(range(min(3, pixels.shape[1])))
+        if not channels:
+            return pixels
+        rng = np.random.default_rng(seed)
+        for start in range(0, len(pixels), QUANTIZE_CHUNK):
+            chunk = pixels[start:start + QUANTIZE_CHUNK]
+            values = chunk[:, channels]
+            if srgb:
+                linear_to_srgb(values)
+            noise = rng.random(values.shape, dtype=np.float32)
+            noise -= rng.random(values.shape, dtype=np.float32)
+            values += noise * (1.0 / 255.0)
+            np.clip(values, 0.0, 1.0, out=values)
+            chunk[:, channels] = values
+    return pixels
@@ -0,0 +1,102 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from mathutils import geometry
+
+
+
+def unique_points(points):
+	"""去除重复的UV坐标（同一UV顶点被多个面角共享）"""
+	points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+	if len(points) < 2:
+		return points
+	return np.unique(points, axis=0)
+
+
+
+def discard_interior(points):
+	"""Akl-Toussaint 预筛：丢弃落在四个极值点围成的四边形内部的点"""
+	if len(points) < 8:
+		return points
+	s = points.sum(axis=1)
+	d = points[:, 0] - points[:, 1]
+	quad = points[[s.argmin(), d.argmax(), s.argmax(), d.argmin()]]
+
+	inside = np.ones(len(points), dtype=bool)
+	for i in range(4):
+		a = quad[i]
+		b = quad[(i + 1) % 4]
+		cross = (b[0] - a[0]) * (points[:, 1] - a[1]) - (b[1] - a[1]) * (points[:, 0] - a[0])
+		inside &= cross > 0
+	return points[~inside]
+
+
+
+def convex_hull(points):
+	"""单调链算法求凸包，返回逆时针顺序的顶点 (H,2)"""
+	# 先用向量化预筛去掉大部分内部点，再去重排序
+	points = unique_points(discard_interior(np.asarray(points, dtype=np.float64).reshape(-1, 2)))
+	if len(points) < 3:
+		return points
+
+	# np.unique 已按 x、y 排序
+	pts = points.tolist()
+
+	def cross(o, a, b):
+		return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+	lower = []
+	for p in pts:
+		while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+			lower.pop()
+		lower.append(p)
+
+	upper = []
+	for p in reversed(pts):
+		while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+			upper.pop()
+		upper.append(p)
+
+	return np.array(lower[:-1] + upper[:-1])
+
+
+
+class HullCache:
+	"""按岛UV内容的哈希缓存凸包和最小包围盒角度，LRU淘汰"""
+
+	def __init__(self, max_entries=4096):
+		self.max_entries = max_entries
+		self.entries = OrderedDict()
+
+	@staticmethod
+	def key(uvs):
+		return hashlib.blake2b(np.ascontiguousarray(uvs, dtype=np.float64).tobytes(), digest_size=16).digest()
+
+	def get(self, uvs):
+		"""返回 (凸包, box_fit_2d 角度)"""
+		key = self.key(uvs)
+		entry = self.entries.get(key)
+		if entry is not None:
+			self.entries.move_to_end(key)
+			return entry
+
+		hull = convex_hull(uvs)
+		angle = geometry.box_fit_2d(hull.tolist()) if len(hull) else 0.0
+		entry = (hull, angle)
+		self.entries[key] = entry
+		if len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+		return entry
+
+	def clear(self):
+		self.entries.clear()
+
+
+
+hull_cache = HullCache()
+
+
+
+def box_fit_angle(uvs):
+	"""岛的最小面积包围盒角度，只把凸包顶点交给 box_fit_2d"""
+	return hull_cache.get(uvs)[1]
@@ -0,0 +1,300 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from operator import attrgetter
+
+precision = 5
+
+
+
+def read_uv_loops(bm, uv_layer, faces):
+	"""批量读取面的循环顶点索引和UV坐标，返回 (每面循环数, 顶点索引, UV数组)"""
+	bm.verts.index_update()
+	sizes = []
+	verts = []
+	uvs = []
+	for face in faces:
+		loops = face.loops
+		sizes.append(len(loops))
+		for loop in loops:
+			verts.append(loop.vert.index)
+			uvs.extend(loop[uv_layer].uv)
+
+	sizes = np.array(sizes, dtype=np.int64)
+	verts = np.array(verts, dtype=np.int64)
+	uvs = np.array(uvs, dtype=np.float64).reshape(-1, 2)
+	return sizes, verts, uvs
+
+
+
+def next_loop_indices(sizes):
+	"""按面平铺的循环数组中，每个循环的下一个循环下标"""
+	starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+	counts = np.repeat(sizes, sizes)
+	local = np.arange(len(starts)) - starts
+	return starts + (local + 1) % counts
+
+
+
+def uv_edge_keys(verts, uvs, sizes):
+	"""每个循环所在UV边的量化键 (vert_a, vert_b, uv_a, uv_b)，顶点按索引升序"""
+	nxt = next_loop_indices(sizes)
+	quant = np.round(uvs * 10 ** precision).astype(np.int64)
+
+	va = verts
+	vb = verts[nxt]
+	qa = quant
+	qb = quant[nxt]
+
+	# 统一方向，保证相邻面上的同一条UV边得到相同的键
+	swap = va > vb
+	va, vb = np.where(swap, vb, va), np.where(swap, va, vb)
+	qa, qb = np.where(swap[:, None], qb, qa), np.where(swap[:, None], qa, qb)
+
+	return np.column_stack((va, vb, qa, qb))
+
+
+
+def shared_edge_pairs(keys, loop_faces):
+	"""找出共享同一UV边的循环所属的面对"""
+	if len(keys) < 2:
+		empty = np.zeros(0, dtype=np.int64)
+		return empty, empty
+
+	order = np.lexsort(keys.T[::-1])
+	sorted_keys = keys[order]
+	same = (sorted_keys[1:] == sorted_keys[:-1]).all(axis=1)
+	return loop_faces[order[:-1][same]], loop_faces[order[1:][same]]
+
+
+
+def union_find(count, a, b):
+	"""对 count 个元素按 (a, b) 对做并查集，返回每个元素的根"""
+	parent = np.arange(count, dtype=np.int64)
+	if not len(a):
+		return parent
+
+	while True:
+		pa = parent[a]
+		pb = parent[b]
+		differ = pa != pb
+		if not differ.any():
+			break
+		lo = np.minimum(pa[differ], pb[differ])
+		hi = np.maximum(pa[differ], pb[differ])
+		# 根总是挂到更小的根上，不会出现环
+		np.minimum.at(parent, hi, lo)
+
+		# 路径压缩，直到每个元素都直接指向根
+		while True:
+			grand = parent[parent]
+			if (grand == parent).all():
+				break
+			parent = grand
+
+	return parent
+
+
+
+def labels_from_arrays(sizes, verts, uvs):
+	"""由批量读取的循环数据计算每个面的岛编号（0起连续，按首次出现排序）"""
+	if not len(sizes):
+		return np.zeros(0, dtype=np.int64)
+
+	loop_faces = np.repeat(np.arange(len(sizes)), sizes)
+	keys = uv_edge_keys(verts, uvs, sizes)
+	a, b = shared_edge_pairs(keys, loop_faces)
+	roots = union_find(len(sizes), a, b)
+
+	_, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+	rank = np.empty(len(first), dtype=np.int64)
+	rank[np.argsort(first)] = np.arange(len(first))
+	return rank[inverse.ravel()]
+
+
+
+def calc_island_labels(bm, uv_layer, faces, mesh=None):
+	"""返回faces中每个面的UV岛编号，传入 mesh 时使用岛缓存"""
+	faces = list(faces)
+	if mesh is not None:
+		return island_cache.labels(mesh, bm, uv_layer, faces)
+	return labels_from_arrays(*read_uv_loops(bm, uv_layer, faces))
+
+
+
+def labels_to_islands(faces, labels):
+	"""按岛编号把面分组为列表"""
+	islands = [[] for _ in range(int(labels.max()) + 1)] if len(labels) else []
+	for face, label in zip(faces, labels.tolist()):
+		islands[label].append(face)
+	return islands
+
+
+
+def calc_islands(bm, uv_layer, faces, mesh=None):
+	"""将面按共享UV边分组为岛，不调用任何操作符"""
+	faces = list(faces)
+	return labels_to_islands(faces, calc_island_labels(bm, uv_layer, faces, mesh))
+
+
+
+def face_island_indices(bm, uv_layer, faces, mesh=None):
+	"""返回以face.index为下标的岛编号列表，不在faces中的面为-1"""
+	faces = list(faces)
+	bm.faces.index_update()
+	island_of = [-1] * len(bm.faces)
+	for face, label in zip(faces, calc_island_labels(bm, uv_layer, faces, mesh).tolist()):
+		island_of[face.index] = label
+	return island_of
+
+
+
+class UVEdgeIndex:
+	"""网格的UV边邻接索引：量化的 (vert_a, vert_b, uv_a, uv_b) -> 面，每次操作构建一次"""
+
+	def __init__(self, bm, uv_layer, faces=None):
+		self.faces = list(bm.faces if faces is None else faces)
+		sizes, verts, uvs = read_uv_loops(bm, uv_layer, self.faces)
+		keys = uv_edge_keys(verts, uvs, sizes)
+
+		self.face_slot = {face: i for i, face in enumerate(self.faces)}
+		self.loop_start = (np.cumsum(sizes) - sizes).tolist()
+		self.loop_total = sizes.tolist()
+		self.keys = list(map(tuple, keys.tolist()))
+
+		self.edge_faces = {}
+		loop_faces = np.repeat(np.arange(len(self.faces)), sizes).tolist()
+		for key, face_slot in zip(self.keys, loop_faces):
+			self.edge_faces.setdefault(key, []).append(face_slot)
+
+	def linked_faces(self, face_slot):
+		"""与给定面共享UV边的面（下标）"""
+		start = self.loop_start[face_slot]
+		for key in self.keys[start:start + self.loop_total[face_slot]]:
+			yield from self.edge_faces[key]
+
+	def island(self, start_face):
+		"""从给定面生长UV岛，耗时与岛的大小成正比"""
+		seed = self.face_slot[start_face]
+		visited = {seed}
+		stack = [seed]
+		while stack:
+			for other in self.linked_faces(stack.pop()):
+				if other not in visited:
+					visited.add(other)
+					stack.append(other)
+		return [self.faces[i] for i in visited]
+
+
+
+def digest(*arrays):
+	"""数组内容的指纹"""
+	h = hashlib.blake2b(digest_size=16)
+	for array in arrays:
+		h.update(np.ascontiguousarray(array).tobytes())
+	return h.digest()
+
+
+
+def edit_fingerprint(bm, uv_layer):
+	"""编辑网格的廉价指纹：元素数量、UV层名和面的选择/隐藏状态，不转换网格也不逐循环读取
+
+	不包含UV坐标：只改动UV而改变了连通性的操作需要调用 island_cache.invalidate"""
+	faces = bm.faces
+	counts = np.array((len(bm.verts), len(bm.edges), len(faces)), dtype=np.int64)
+	select = np.fromiter((face.select for face in faces), dtype=bool, count=len(faces))
+	hide = np.fromiter((face.hide for face in faces), dtype=bool, count=len(faces))
+	return digest(counts, select, hide, uv_layer.name.encode())
+
+
+
+class IslandCacheEntry:
+	def __init__(self, fingerprint, labels):
+		self.fingerprint = fingerprint
+		self.labels = labels
+		self.dirty = False
+
+	@property
+	def nbytes(self):
+		return self.labels.nbytes + 16
+
+
+
+class IslandCache:
+	"""按 (网格, UV层, 参与计算的面) 缓存岛编号，由 depsgraph 更新标记失效，按LRU淘汰"""
+
+	def __init__(self, max_bytes=64 * 1024 * 1024):
+		self.max_bytes = max_bytes
+		self.entries = OrderedDict()
+		self.total_bytes = 0
+		self.recent = {}
+		self.kept = set()
+		self.hits = 0
+		self.misses = 0
+
+	def labels(self, mesh, bm, uv_layer, faces):
+		uid = mesh.session_uid
+		bm.faces.index_update()
+		face_indices = np.fromiter(map(attrgetter('index'), faces), dtype=np.int64, count=len(faces))
+		key = (uid, uv_layer.name, digest(face_indices))
+		self.recent[uid] = key
+
+		entry = self.entries.get(key)
+		if entry is not None and not entry.dirty:
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return entry.labels
+
+		# 被 depsgraph 更新标记失效时（选择变化、编辑等）先比较廉价指纹，拓扑和选择都没变则无需重新分岛
+		fingerprint = edit_fingerprint(bm, uv_layer)
+		if entry is not None and entry.fingerprint == fingerprint:
+			entry.dirty = False
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return entry.labels
+
+		self.misses += 1
+		labels = labels_from_arrays(*read_uv_loops(bm, uv_layer, faces))
+		self.store(key, IslandCacheEntry(fingerprint, labels))
+		return labels
+
+	def store(self, key, entry):
+		old = self.entries.pop(key, None)
+		if old is not None:
+			self.total_bytes -= old.nbytes
+		self.entries[key] = entry
+		self.total_bytes += entry.nbytes
+		while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+			_, evicted = self.entries.popitem(last=False)
+			self.total_bytes -= evicted.nbytes
+
+	def keep(self, mesh):
+		"""本次操作只对整岛做了旋转、平移等刚性变换，岛的连通性不变，下一次更新时保留最近使用的缓存
+
+		只移动部分UV点、拆分或缝合UV的操作不能调用，应改用 invalidate"""
+		key = self.recent.get(mesh.session_uid)
+		if key is not None:
+			self.kept.add(key)
+
+	def mark_dirty(self, uid):
+		"""depsgraph 更新时调用：标记失效，下次使用时用廉价指纹重新验证"""
+		for key, entry in self.entries.items():
+			if key[0] == uid and key not in self.kept:
+				entry.dirty = True
+		self.kept = {key for key in self.kept if key[0] != uid}
+
+	def invalidate(self, uid):
+		"""操作改变了UV连通性：丢弃该网格的所有缓存"""
+		for key in [key for key in self.entries if key[0] == uid]:
+			self.total_bytes -= self.entries.pop(key).nbytes
+		self.kept = {key for key in self.kept if key[0] != uid}
+
+	def clear(self):
+		self.entries.clear()
+		self.recent.clear()
+		self.kept.clear()
+		self.total_bytes = 0
+
+
+
+island_cache = IslandCache()
@@ -0,0 +1,578 @@
+import bpy
+import bmesh
+import numpy as np
+from collections import OrderedDict
+from bpy.app.handlers import persistent
+from . import settings
+from . import utils_island
+
+
+
+def read_array(collection, attr, dtype, count, width=1):
+	"""foreach_get 读取到 numpy 数组，width>1 时整形为 (count, width)"""
+	array = np.empty(count * width, dtype=dtype)
+	collection.foreach_get(attr, array)
+	return array.reshape(-1, width) if width > 1 else array
+
+
+
+def face_normals(mesh):
+	return read_array(mesh.polygons, 'normal', np.float32, len(mesh.polygons), 3)
+
+
+
+def selected_faces(mesh):
+	return read_array(mesh.polygons, 'select', bool, len(mesh.polygons))
+
+
+
+def edge_loop_csr(loop_edges, edge_count):
+	"""按边分组的循环 (CSR)：返回 (偏移, 按边排序的循环下标)"""
+	order = np.argsort(loop_edges, kind='stable')
+	counts = np.bincount(loop_edges, minlength=edge_count)
+	offsets = np.zeros(edge_count + 1, dtype=np.int64)
+	np.cumsum(counts, out=offsets[1:])
+	return offsets, order
+
+
+
+def dihedral_angles(normals, edge_offsets, edge_faces):
+	"""每条边相邻面法线间的最大夹角（弧度），边界边和松散边为0"""
+	normals = np.asarray(normals, dtype=np.float64)
+	counts = np.diff(edge_offsets)
+	starts = edge_offsets[:-1]
+	angles = np.zeros(len(counts))
+
+	# 流形边：正好两个面
+	manifold = np.flatnonzero(counts == 2)
+	f0 = edge_faces[starts[manifold]]
+	f1 = edge_faces[starts[manifold] + 1]
+	angles[manifold] = _normal_angles(normals[f0], normals[f1])
+
+	# 非流形边（多于两个面）数量很少，逐条比较所有面对
+	for edge in np.flatnonzero(counts > 2).tolist():
+		n = normals[edge_faces[starts[edge]:starts[edge + 1]]]
+		i, j = np.triu_indices(len(n), 1)
+		angles[edge] = _normal_angles(n[i], n[j]).max()
+	return angles
+
+
+
+def _normal_angles(a, b):
+	"""两组法线间的夹角，退化面（零法线）视为0"""
+	lengths = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+	dots = np.einsum('ij,ij->i', a, b)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		cos = np.where(lengths > 0, dots / lengths, 1.0)
+	return np.arccos(np.clip(cos, -1.0, 1.0))
+
+
+
+class MeshAnalysis:
+	"""网格的拓扑与几何分析数组：拓扑部分构建时计算，几何部分按需计算"""
+
+	def __init__(self, mesh, loop_total, loop_verts, loop_edges, topology):
+		self.topology = topology
+		self.geometry = None
+		self.edge_count = len(mesh.edges)
+		self.loop_total = loop_total
+		self.loop_verts = loop_verts
+		self.loop_edges = loop_edges
+		self.loop_faces = np.repeat(np.arange(len(loop_total)), loop_total)
+		self.next_loop = utils_island.next_loop_indices(loop_total)
+
+		# 边 -> 循环 / 面 (CSR)
+		self.edge_offsets, self.edge_loops = edge_loop_csr(loop_edges, self.edge_count)
+		self.edge_faces = self.loop_faces[self.edge_loops]
+		self.edge_face_counts = np.diff(self.edge_offsets)
+
+		# 循环 -> 同一条边上的下一个循环（环状），边界边为 -1
+		position = np.arange(len(loop_edges))
+		sorted_edges = loop_edges[self.edge_loops]
+		following = position + 1
+		wrap = following >= self.edge_offsets[sorted_edges + 1]
+		following[wrap] = self.edge_offsets[sorted_edges[wrap]]
+		self.radial = np.empty(len(loop_edges), dtype=np.int64)
+		self.radial[self.edge_loops] = self.edge_loops[following]
+		self.radial[self.edge_face_counts[loop_edges] < 2] = -1
+
+		self.reset_geometry()
+
+	@staticmethod
+	def read_topology(mesh):
+		loop_total = read_array(mesh.polygons, 'loop_total', np.int32, len(mesh.polygons))
+		loop_verts = read_array(mesh.loops, 'vertex_index', np.int32, len(mesh.loops))
+		loop_edges = read_array(mesh.loops, 'edge_index', np.int32, len(mesh.loops))
+		topology = utils_island.digest(loop_total, loop_verts, loop_edges, np.int64(len(mesh.edges)))
+		return loop_total, loop_verts, loop_edges, topology
+
+	@staticmethod
+	def read_geometry(mesh):
+		return utils_island.digest(read_array(mesh.vertices, 'co', np.float32, len(mesh.vertices), 3))
+
+	def reset_geometry(self, geometry=None):
+		self.geometry = geometry
+		self._normals = None
+		self._areas = None
+		self._angles = None
+		self._angle_order = None
+
+	def normals(self, mesh):
+		if self._normals is None:
+			self._normals = face_normals(mesh)
+		return self._normals
+
+	def areas(self, mesh):
+		if self._areas is None:
+			self._areas = read_array(mesh.polygons, 'area', np.float32, len(mesh.polygons))
+		return self._areas
+
+	def angles(self, mesh):
+		if self._angles is None:
+			self._angles = dihedral_angles(self.normals(mesh), self.edge_offsets, self.edge_faces)
+		return self._angles
+
+	def angle_order(self, mesh):
+		"""按二面角升序排列的边下标，只排序一次"""
+		if self._angle_order is None:
+			self._angle_order = np.argsort(self.angles(mesh), kind='stable')
+		return self._angle_order
+
+	def face_edge_mask(self, face_mask):
+		"""face_mask 中的面所用到的边"""
+		mask = np.zeros(self.edge_count, dtype=bool)
+		mask[self.loop_edges[face_mask[self.loop_faces]]] = True
+		return mask
+
+	def region_boundary(self, face_mask):
+		"""face_mask 区域内的边和区域的边界环（与未选面相邻或位于网格边界的边）"""
+		selected = np.bincount(self.loop_edges, weights=face_mask[self.loop_faces], minlength=self.edge_count)
+		inside = selected > 0
+		boundary = inside & ((selected < self.edge_face_counts) | (self.edge_face_counts == 1))
+		return inside, boundary
+
+
+
+class MeshAnalysisCache:
+	"""按 mesh.session_uid 缓存分析结果；depsgraph 更新后先比较拓扑和几何指纹，未变则继续使用"""
+
+	def __init__(self, max_entries=16):
+		self.max_entries = max_entries
+		self.entries = OrderedDict()
+		self.dirty = set()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, mesh):
+		uid = mesh.session_uid
+		analysis = self.entries.get(uid)
+		if analysis is not None and uid not in self.dirty:
+			self.entries.move_to_end(uid)
+			self.hits += 1
+			return analysis
+
+		self.dirty.discard(uid)
+		topology_arrays = MeshAnalysis.read_topology(mesh)
+		geometry = MeshAnalysis.read_geometry(mesh)
+		if analysis is not None and analysis.topology == topology_arrays[-1]:
+			# 拓扑未变，只有几何变化时丢弃法线、面积和角度
+			if analysis.geometry != geometry:
+				analysis.reset_geometry(geometry)
+			self.entries.move_to_end(uid)
+			self.hits += 1
+			return analysis
+
+		self.misses += 1
+		analysis = MeshAnalysis(mesh, *topology_arrays)
+		analysis.geometry = geometry
+		self.entries[uid] = analysis
+		self.entries.move_to_end(uid)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+		return analysis
+
+	def invalidate(self, uid):
+		if uid in self.entries:
+			self.dirty.add(uid)
+
+	def clear(self):
+		self.entries.clear()
+		self.dirty.clear()
+
+
+
+analysis_cache = MeshAnalysisCache()
+
+
+
+def analyze(mesh):
+	"""取得网格的分析结果（物体模式数据）"""
+	return analysis_cache.get(mesh)
+
+
+
+def unique_mesh_objects(context):
+	"""选中的网格物体，共用同一网格数据的只保留一个"""
+	objects = []
+	seen = set()
+	for obj in context.selected_objects:
+		if obj.type == 'MESH' and obj.data.session_uid not in seen:
+			seen.add(obj.data.session_uid)
+			objects.append(obj)
+	return objects
+
+
+
+def sync(obj):
+	"""编辑模式下先把 BMesh 同步到网格数据，之后可以用 foreach_get 读取"""
+	if obj.mode == 'EDIT':
+		obj.update_from_editmode()
+
+
+
+class Flag:
+	"""边/面上的布尔标记：4.0 起的属性名、旧版本的属性、BMesh 上对应的属性"""
+
+	def __init__(self, domain, attribute, legacy, bm_attr, inverted):
+		self.domain = domain
+		self.attribute = attribute
+		self.legacy = legacy
+		self.bm_attr = bm_attr
+		# 旧属性与 BMesh 属性表示的是相反的值（平滑/锐利）
+		self.inverted = inverted
+
+	def collection(self, mesh):
+		return mesh.edges if self.domain == 'EDGE' else mesh.polygons
+
+	def uses_attribute(self):
+		return self.attribute is not None and settings.bversion >= 4.0
+
+
+FLAGS = {
+	'SHARP': Flag('EDGE', 'sharp_edge', 'use_edge_sharp', 'smooth', False),
+	'SEAM': Flag('EDGE', None, 'use_seam', 'seam', False),
+	'SHARP_FACE': Flag('FACE', 'sharp_face', 'use_smooth', 'smooth', True),
+}
+
+
+
+def read_flags(mesh, kind):
+	"""读取网格数据上的标记（编辑模式先 sync）"""
+	flag = FLAGS[kind]
+	collection = flag.collection(mesh)
+	if not flag.uses_attribute():
+		values = read_array(collection, flag.legacy, bool, len(collection))
+		return ~values if flag.inverted else values
+	attribute = mesh.attributes.get(flag.attribute)
+	if attribute is None:
+		return np.zeros(len(collection), dtype=bool)
+	return read_array(attribute.data, 'value', bool, len(collection))
+
+
+
+def _write_bulk(mesh, flag, mask):
+	if not flag.uses_attribute():
+		flag.collection(mesh).foreach_set(flag.legacy, ~mask if flag.inverted else mask)
+		return
+	attribute = mesh.attributes.get(flag.attribute)
+	if attribute is None:
+		if not mask.any():
+			return
+		attribute = mesh.attributes.new(flag.attribute, 'BOOLEAN', flag.domain)
+	attribute.data.foreach_set('value', mask)
+
+
+
+def write_flags(obj, kind, mask, indices=None):
+	"""写入标记，返回改变的元素数量；indices 为可能变化的元素，不给时与现有标记比较得出
+
+	编辑模式只改写变化的 BMesh 元素；物体模式变化多时一次 foreach_set，少时逐个写入"""
+	flag = FLAGS[kind]
+	mesh = obj.data
+	mask = np.ascontiguousarray(mask, dtype=bool)
+	if indices is None:
+		indices = np.flatnonzero(read_flags(mesh, kind) != mask)
+	if not len(indices):
+		return 0
+	values = mask[indices].tolist()
+
+	if obj.mode == 'EDIT':
+		bm = bmesh.from_edit_mesh(mesh)
+		elements = bm.edges if flag.domain == 'EDGE' else bm.faces
+		elements.ensure_lookup_table()
+		bm_inverted = flag.bm_attr == 'smooth'
+		for index, value in zip(indices.tolist(), values):
+			setattr(elements[index], flag.bm_attr, value != bm_inverted)
+		bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
+	elif len(indices) * 8 > len(mask) or not flag.uses_attribute():
+		_write_bulk(mesh, flag, mask)
+		mesh.update()
+	else:
+		if mesh.attributes.get(flag.attribute) is None:
+			mesh.attributes.new(flag.attribute, 'BOOLEAN', flag.domain)
+		data = mesh.attributes[flag.attribute].data
+		for index, value in zip(indices.tolist(), values):
+			data[index].value = value
+		mesh.update()
+	return len(indices)
+
+
+
+def write_edge_mask(obj, mask, target='SHARP', extend=False):
+	"""把边掩码写入锐边、缝合线或两者，extend 为 True 时与原有标记合并；返回改变的边数"""
+	changed = 0
+	for kind in ('SHARP', 'SEAM'):
+		if target in {kind, 'BOTH'}:
+			changed += write_flags(obj, kind, mask | read_flags(obj.data, kind) if extend else mask)
+	return changed
+
+
+
+def shade_smooth(obj):
+	"""清除所有面的锐利标记，代替 bpy.ops.object.shade_smooth"""
+	return write_flags(obj, 'SHARP_FACE', np.zeros(len(obj.data.polygons), dtype=bool))
+
+
+
+class SharpPreview:
+	"""交互调整锐边角度：二面角只排序一次，阈值变化时二分查找出状态翻转的边并只改写这些边"""
+
+	def __init__(self, mesh, analysis, process, mask, threshold):
+		# 建立预览时网格的拓扑和几何指纹，不一致时按当前网格重建
+		self.topology = analysis.topology
+		self.geometry = analysis.geometry
+		self.angles = analysis.angles(mesh)
+		self.order = analysis.angle_order(mesh)
+		self.sorted_angles = self.angles[self.order]
+		self.process = process
+		self.mask = mask
+		self.threshold = threshold
+
+	@staticmethod
+	def sharp_mask(mesh, analysis, threshold):
+		"""处理选中面的边（没有选中的面时处理所有面），返回 (处理的边, 按阈值设置后的锐边)"""
+		face_mask = selected_faces(mesh)
+		if not face_mask.any():
+			face_mask[:] = True
+		process = analysis.face_edge_mask(face_mask)
+		mask = read_flags(mesh, 'SHARP')
+		mask[process] = analysis.angles(mesh)[process] > threshold
+		return process, mask
+
+	@classmethod
+	def build(cls, mesh, analysis, threshold):
+		return cls(mesh, analysis, *cls.sharp_mask(mesh, analysis, threshold), threshold)
+
+	def stale(self, analysis):
+		return analysis.topology != self.topology or analysis.geometry != self.geometry
+
+	def flipped(self, threshold):
+		"""阈值从当前值变为 threshold 时状态翻转的边"""
+		low, high = sorted((self.threshold, threshold))
+		start = np.searchsorted(self.sorted_angles, low, side='right')
+		end = np.searchsorted(self.sorted_angles, high, side='right')
+		edges = self.order[start:end]
+		return edges[self.process[edges]]
+
+	def move(self, threshold):
+		"""阈值移到 threshold，返回状态翻转的边"""
+		edges = self.flipped(threshold)
+		self.mask[edges] = self.angles[edges] > threshold
+		self.threshold = threshold
+		return edges
+
+	def update(self, obj, threshold):
+		"""拖动滑块时的预览：沿用排序好的角度，不同步网格也不重新分析，只改写翻转的边
+
+		边数不一致时跳过，由 apply 按当前网格重建"""
+		if threshold == self.threshold:
+			return 0
+		edge_count = len(bmesh.from_edit_mesh(obj.data).edges) if obj.mode == 'EDIT' else len(obj.data.edges)
+		if edge_count != len(self.mask):
+			return 0
+		edges = self.move(threshold)
+		write_flags(obj, 'SHARP', self.mask, edges)
+		return len(edges)
+
+	def apply(self, obj, threshold):
+		"""最终写入（由可撤销的操作符在 sync 之后调用）：验证预览，网格变化后按当前网格重建"""
+		# 移动顶点或修改拓扑（即使边数不变）后，旧的角度和边下标都不再可用
+		mesh = obj.data
+		analysis = analyze(mesh)
+		if self.stale(analysis):
+			self.__init__(mesh, analysis, *self.sharp_mask(mesh, analysis, threshold), threshold)
+		else:
+			self.move(threshold)
+		return write_flags(obj, 'SHARP', self.mask)
+
+
+
+# 锐边角度预览，键为 mesh.session_uid
+sharp_previews = {}
+
+
+
+def uv_split_edges(mesh, uv_name=None, analysis=None, decimals=6):
+	"""UV不连续的边：与径向相邻循环的边两端UV不同"""
+	if analysis is None:
+		analysis = analyze(mesh)
+	mask = np.zeros(analysis.edge_count, dtype=bool)
+	uv_layer = mesh.uv_layers.get(uv_name) if uv_name else mesh.uv_layers.active
+	if uv_layer is None or not len(analysis.loop_edges):
+		return mask
+
+	uvs = np.round(read_array(uv_layer.data, 'uv', np.float32, len(mesh.loops), 2).astype(np.float64), decimals)
+	nxt = analysis.next_loop
+	verts = analysis.loop_verts
+
+	# 每个循环的边两端UV按顶点索引排列，相邻面上连续的UV边得到相同的值
+	swap = (verts > verts[nxt])[:, None]
+	key = np.hstack((np.where(swap, uvs[nxt], uvs), np.where(swap, uvs, uvs[nxt])))
+
+	# 边上的循环首尾相连成环，任一相邻对不同即为UV边界
+	shared = np.flatnonzero(analysis.radial >= 0)
+	differ = (key[shared] != key[analysis.radial[shared]]).any(axis=1)
+	mask[analysis.loop_edges[shared[differ]]] = True
+	return mask
+
+
+
+def hash_rows(keys):
+	"""每行整数键的64位 FNV 风格哈希"""
+	h = np.full(len(keys), 0xcbf29ce484222325, dtype=np.uint64)
+	prime = np.uint64(0x100000001b3)
+	with np.errstate(over='ignore'):
+		for column in keys.T:
+			h = (h ^ column.astype(np.uint64)) * prime
+			h ^= h >> np.uint64(29)
+	return h
+
+
+
+def count_unique_rows(keys):
+	"""按行去重（比较哈希，碰撞概率可忽略）：返回 (每行的唯一编号, 唯一行数)"""
+	if not len(keys):
+		return np.zeros(0, dtype=np.int64), 0
+	unique, ids = np.unique(hash_rows(keys), return_inverse=True)
+	return ids.ravel(), len(unique)
+
+
+
+class VertexSplitEstimate:
+	"""导出到游戏引擎后的顶点数估算"""
+
+	def __init__(self, verts, split_verts, split_edges, worst_edges):
+		self.verts = verts
+		self.split_verts = split_verts
+		self.split_edges = split_edges
+		# [(边索引, 两端顶点的拷贝数之和), ...]
+		self.worst_edges = worst_edges
+
+	@property
+	def ratio(self):
+		return self.split_verts / self.verts if self.verts else 1.0
+
+
+
+def estimate_vertex_splits(mesh, analysis=None, precision=5, worst=5):
+	"""按 (顶点, 法线平滑组, 每层UV) 对面角去重，估算引擎中的实际顶点数
+
+	锐边、平直着色的面和UV不连续处都会拆分顶点；缝合线只在UV不连续时才产生拆分"""
+	if analysis is None:
+		analysis = analyze(mesh)
+	verts = analysis.loop_verts
+	nxt = analysis.next_loop
+	radial = analysis.radial
+	loop_count = len(verts)
+
+	# 平滑组：跨过非锐边、两侧都平滑着色的流形边时，同一顶点的面角相连
+	sharp = read_flags(mesh, 'SHARP')
+	flat = read_flags(mesh, 'SHARP_FACE')
+	loops = np.arange(loop_count)
+	partner = radial
+	smooth = (partner > loops) & (analysis.edge_face_counts[analysis.loop_edges] == 2)
+	smooth &= ~sharp[analysis.loop_edges]
+	smooth &= ~flat[analysis.loop_faces] & ~flat[analysis.loop_faces[np.maximum(partner, 0)]]
+	l = loops[smooth]
+	r = partner[smooth]
+
+	# 两侧面的环绕方向相反时，l 的起点对应 r 的终点
+	opposite = verts[l] != verts[r]
+	a0, b0 = l, np.where(opposite, nxt[r], r)
+	a1, b1 = nxt[l], np.where(opposite, r, nxt[r])
+	groups = utils_island.union_find(loop_count, np.concatenate((a0, a1)), np.concatenate((b0, b1)))
+
+	columns = [groups[:, None]]
+	for uv_layer in mesh.uv_layers:
+		uvs = read_array(uv_layer.data, 'uv', np.float32, loop_count, 2).astype(np.float64)
+		columns.append(np.round(uvs * 10 ** precision).astype(np.int64))
+	ids, unique = count_unique_rows(np.hstack(columns))
+
+	# 松散顶点不属于任何面角，原样计入
+	vert_count = len(mesh.vertices)
+	used = np.zeros(vert_count, dtype=bool)
+	used[verts] = True
+	split_verts = unique + int((~used).sum())
+
+	# 边两侧对应面角不同即为拆分边；按两端顶点的拷贝数排序找出最严重的边
+	first_loop = np.zeros(unique, dtype=np.int64)
+	first_loop[ids] = loops
+	copies = np.bincount(verts[first_loop], minlength=vert_count)
+	manifold = (partner > loops) & (analysis.edge_face_counts[analysis.loop_edges] == 2)
+	l = loops[manifold]
+	r = partner[manifold]
+	opposite = verts[l] != verts[r]
+	split = (ids[l] != ids[np.where(opposite, nxt[r], r)]) | (ids[nxt[l]] != ids[np.where(opposite, r, nxt[r])])
+	split_loops = l[split]
+	cost = copies[verts[split_loops]] + copies[verts[nxt[split_loops]]]
+	top = np.argsort(-cost, kind='stable')[:worst]
+	worst_edges = list(zip(analysis.loop_edges[split_loops[top]].tolist(), cost[top].tolist()))
+
+	return VertexSplitEstimate(vert_count, split_verts, int(split.sum()), worst_edges)
+
+
+
+# 顶点拆分估算结果，键为物体名
+split_estimates = {}
+
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+	"""网格几何变化时同时标记岛缓存和分析缓存失效（插件唯一的 depsgraph 处理函数）"""
+	for update in depsgraph.updates:
+		if not update.is_updated_geometry:
+			continue
+		id_data = update.id.original
+		if isinstance(id_data, bpy.types.Object):
+			if id_data.type != 'MESH':
+				continue
+			id_data = id_data.data
+		if isinstance(id_data, bpy.types.Mesh):
+			uid = id_data.session_uid
+			utils_island.island_cache.mark_dirty(uid)
+			analysis_cache.invalidate(uid)
+
+
+
+@persistent
+def on_load_post(*args):
+	utils_island.island_cache.clear()
+	analysis_cache.clear()
+	sharp_previews.clear()
+	split_estimates.clear()
+
+
+
+def register():
+	bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+	bpy.app.handlers.load_post.append(on_load_post)
+
+def unregister():
+	if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+		bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+	if on_load_post in bpy.app.handlers.load_post:
+		bpy.app.handlers.load_post.remove(on_load_post)
+	utils_island.island_cache.clear()
+	analysis_cache.clear()
+	sharp_previews.clear()
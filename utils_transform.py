@@ -0,0 +1,198 @@
+import math
+import bmesh
+import numpy as np
+from . import utils_bbox
+
+
+
+def identity(count=1):
+	"""count 个 2x3 单位仿射矩阵"""
+	matrices = np.zeros((count, 2, 3))
+	matrices[:, 0, 0] = 1.0
+	matrices[:, 1, 1] = 1.0
+	return matrices
+
+
+
+def translation(dx, dy):
+	matrix = identity()[0]
+	matrix[:, 2] = (dx, dy)
+	return matrix
+
+
+
+def rotation(angle, pivot=(0.0, 0.0)):
+	"""绕 pivot 逆时针旋转 angle（弧度）"""
+	c = math.cos(angle)
+	s = math.sin(angle)
+	px, py = pivot
+	return np.array((
+		(c, -s, px - c * px + s * py),
+		(s, c, py - s * px - c * py),
+	))
+
+
+
+def scaling(scale_x, scale_y, pivot=(0.0, 0.0)):
+	px, py = pivot
+	return np.array((
+		(scale_x, 0.0, px - scale_x * px),
+		(0.0, scale_y, py - scale_y * py),
+	))
+
+
+
+def compose(after, before):
+	"""先应用 before 再应用 after 的仿射矩阵，支持 (2,3) 或 (N,2,3)"""
+	linear = after[..., :2] @ before[..., :2]
+	offset = (after[..., :2] @ before[..., 2:])[..., 0] + after[..., 2]
+	return np.concatenate((linear, offset[..., None]), axis=-1)
+
+
+
+def apply_affine(uvs, counts, matrices):
+	"""一次性对按岛平铺的UV数组应用每个岛各自的 2x3 仿射矩阵"""
+	per_loop = np.repeat(matrices, counts, axis=0)
+	return np.einsum('nij,nj->ni', per_loop[:, :, :2], uvs) + per_loop[:, :, 2]
+
+
+
+class IslandUVs:
+	"""一组岛的循环及其UV坐标，按岛顺序平铺为 numpy 数组"""
+
+	def __init__(self, islands, uv_layer, are_loops=False):
+		self.uv_layer = uv_layer
+		if are_loops:
+			self.loops = [loop for group in islands for loop in group]
+			counts = [len(group) for group in islands]
+		else:
+			self.loops = []
+			counts = []
+			for island in islands:
+				start = len(self.loops)
+				for face in island:
+					self.loops.extend(face.loops)
+				counts.append(len(self.loops) - start)
+
+		self.counts = np.array(counts, dtype=np.int64)
+		self.offsets = np.concatenate(([0], np.cumsum(self.counts)))
+		self.uvs = np.array([c for loop in self.loops for c in loop[uv_layer].uv], dtype=np.float64).reshape(-1, 2)
+
+	def __len__(self):
+		return len(self.counts)
+
+	def island_uvs(self, index):
+		return self.uvs[self.offsets[index]:self.offsets[index + 1]]
+
+	def transform(self, matrices):
+		"""matrices 为 (2,3) 时所有岛共用，为 (N,2,3) 时每岛一个"""
+		matrices = np.asarray(matrices, dtype=np.float64)
+		if matrices.ndim == 2:
+			matrices = np.broadcast_to(matrices, (len(self), 2, 3))
+		self.uvs = apply_affine(self.uvs, self.counts, matrices)
+
+	def flush(self, changed=None):
+		"""写回 BMesh，每个循环只赋值一次；changed 为每岛的布尔掩码时跳过未变化的岛"""
+		uv_layer = self.uv_layer
+		if changed is None:
+			for loop, uv in zip(self.loops, self.uvs.tolist()):
+				loop[uv_layer].uv = uv
+			return
+		for index in np.flatnonzero(changed).tolist():
+			start, end = self.offsets[index], self.offsets[index + 1]
+			for loop, uv in zip(self.loops[start:end], self.uvs[start:end].tolist()):
+				loop[uv_layer].uv = uv
+
+
+
+def transform_islands(islands, uv_layer, matrices, are_loops=False):
+	"""编辑模式：对多个岛应用各自的仿射矩阵，一次读取、一次写回"""
+	if not islands:
+		return
+	island_uvs = IslandUVs(islands, uv_layer, are_loops)
+	island_uvs.transform(matrices)
+	island_uvs.flush()
+
+
+
+class TransactionGroup:
+	"""事务中属于同一网格的一组岛：原始UV只读取一次，变换只记录为矩阵"""
+
+	def __init__(self, mesh, island_uvs):
+		self.mesh = mesh
+		self.island_uvs = island_uvs
+		self.matrices = identity(len(island_uvs))
+		self.source_bounds = None
+		self.transformed = None
+
+	def __len__(self):
+		return len(self.island_uvs)
+
+	def transform(self, matrices, indices=None):
+		"""在已记录的变换之后追加变换，matrices 为 (2,3) 或与 indices 对应的 (N,2,3)"""
+		matrices = np.asarray(matrices, dtype=np.float64)
+		if indices is None:
+			self.matrices = compose(matrices, self.matrices)
+		else:
+			self.matrices[indices] = compose(matrices, self.matrices[indices])
+		self.transformed = None
+
+	def uvs(self):
+		"""合成变换后的UV（只在 numpy 中计算，不读写 BMesh）"""
+		if self.transformed is None:
+			self.transformed = apply_affine(self.island_uvs.uvs, self.island_uvs.counts, self.matrices)
+		return self.transformed
+
+	def bounds(self):
+		"""每个岛变换后的边界框（BBoxArray），没有旋转时直接由原始边界框推出"""
+		if self.source_bounds is None:
+			self.source_bounds = utils_bbox.BBoxArray.from_uvs(self.island_uvs.uvs, self.island_uvs.offsets)
+
+		linear = self.matrices[:, :, :2]
+		axis_aligned = (linear[:, 0, 1] == 0) & (linear[:, 1, 0] == 0)
+		if not axis_aligned.all():
+			return utils_bbox.BBoxArray.from_uvs(self.uvs(), self.island_uvs.offsets)
+
+		source = self.source_bounds
+		x0 = source.xmin * linear[:, 0, 0] + self.matrices[:, 0, 2]
+		x1 = source.xmax * linear[:, 0, 0] + self.matrices[:, 0, 2]
+		y0 = source.ymin * linear[:, 1, 1] + self.matrices[:, 1, 2]
+		y1 = source.ymax * linear[:, 1, 1] + self.matrices[:, 1, 2]
+		return utils_bbox.BBoxArray(np.minimum(x0, x1), np.maximum(x0, x1), np.minimum(y0, y1), np.maximum(y0, y1))
+
+	def bboxes(self):
+		return list(self.bounds())
+
+	def flush(self):
+		"""写回有变化的岛，返回是否有岛被修改"""
+		changed = (self.matrices != identity(len(self))).any(axis=(1, 2))
+		if not changed.any():
+			return False
+		self.island_uvs.uvs = self.uvs()
+		self.island_uvs.flush(changed)
+		return True
+
+
+
+class UVTransaction:
+	"""把一次操作中的多步岛变换合成后统一提交，每个网格只写回并 update_edit_mesh 一次"""
+
+	def __init__(self):
+		self.groups = []
+
+	def add(self, mesh, uv_layer, islands, are_loops=False):
+		group = TransactionGroup(mesh, IslandUVs(islands, uv_layer, are_loops))
+		self.groups.append(group)
+		return group
+
+	def commit(self):
+		"""只刷新确实有岛被修改的网格"""
+		meshes = []
+		for group in self.groups:
+			if not len(group) or not group.flush():
+				continue
+			if group.mesh not in meshes:
+				meshes.append(group.mesh)
+		for mesh in meshes:
+			bmesh.update_edit_mesh(mesh)
+		self.groups.clear()
@@ -1,213 +1,119 @@
 import bpy
 import bmesh
 import math
+import time
 import mathutils
+import numpy as np
 from mathutils import Vector
 from . import settings
+from . import utils_island
+from . import utils_transform
+from . import utils_hull
 
 precision = 5
 multi_object_loop_stop = False
 
 
 
-def multi_object_loop(func, *args, need_results = False, **kwargs) :
-	selected_obs = [ob for ob in bpy.context.selected_objects if ob.type == 'MESH']
+class MultiObjectRun:
+	"""在编辑模式内逐个处理物体：直接取编辑网格，不切换模式，记录每个物体的结果和耗时"""
 
-	if len(selected_obs) == 1:
-		preactiv_name = bpy.context.view_layer.objects.active.name
-		bpy.context.view_layer.objects.active = selected_obs[0]
-		if not need_results:
-			func(*args, **kwargs)
-			if bpy.data.objects[preactiv_name]:
-				bpy.context.view_layer.objects.active = bpy.data.objects[preactiv_name]
-		else:
-			result = func(*args, **kwargs)
-			results = [result]
-			if bpy.data.objects[preactiv_name]:
-				bpy.context.view_layer.objects.active = bpy.data.objects[preactiv_name]
-			return results
+	def __init__(self, context=None, objects=None):
+		context = context or bpy.context
+		if objects is None:
+			objects = [ob for ob in context.objects_in_mode_unique_data if ob.type == 'MESH']
+		self.context = context
+		self.objects = objects
+		self.results = {}
+		self.timings = {}
+		self.cancelled = False
 
-	else:
-		global multi_object_loop_stop
-		multi_object_loop_stop = False
-		premode = bpy.context.active_object.mode
-		preactiv_name = bpy.context.view_layer.objects.active.name
+	def cancel(self):
+		"""协作式取消：当前物体处理完后停止"""
+		self.cancelled = True
 
-		bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-		unique_selected_obs = [ob for ob in bpy.context.objects_in_mode_unique_data if ob.type == 'MESH' and ob.select_get()]
-		bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-		bpy.ops.object.select_all(action='DESELECT')
+	def run(self, func, *args, update=True, **kwargs):
+		"""对每个物体调用 func(ob, bm, *args, **kwargs)，返回 {物体名: 结果}
 
-		if need_results :
-			results = []
+		update 为 'CHANGED' 时只刷新 func 返回真值（表示修改了网格）的物体"""
+		global multi_object_loop_stop
+		multi_object_loop_stop = False
 
-		for ob in unique_selected_obs:
-			if multi_object_loop_stop:
+		for ob in self.objects:
+			if self.cancelled or multi_object_loop_stop:
+				self.cancelled = True
 				break
-			bpy.context.view_layer.objects.active = ob
-			bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-			if "ob_num" in kwargs :
-				print("Operating on object " + str(kwargs["ob_num"]))
-			if need_results :
-				result = func(*args, **kwargs)
-				#if result:
-				results.append(result)
-			else:
-				func(*args, **kwargs)
-			if "ob_num" in kwargs:
-				kwargs["ob_num"] += 1
-			bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-			bpy.ops.object.select_all(action='DESELECT')
+			start = time.perf_counter()
+			bm = bmesh.from_edit_mesh(ob.data)
+			result = func(ob, bm, *args, **kwargs)
+			self.results[ob.name] = result
+			changed = bool(result) if update == 'CHANGED' else update
+			if changed:
+				bmesh.update_edit_mesh(ob.data, loop_triangles=False, destructive=False)
+			self.timings[ob.name] = time.perf_counter() - start
+		return self.results
 
-		for ob in selected_obs:
-			ob.select_set(True)
+	@property
+	def total_time(self):
+		return sum(self.timings.values())
 
-		bpy.context.view_layer.objects.active = bpy.data.objects[preactiv_name]
-		bpy.ops.object.mode_set(mode=premode)
+	def report_timings(self):
+		return ", ".join(f"{name}: {seconds * 1000:.1f}ms" for name, seconds in self.timings.items())
 
-		if need_results :
-			return results
 
 
+def multi_object_loop(func, *args, need_results = False, **kwargs) :
+	"""兼容旧接口：func 通过 active_object 取得当前物体
 
-def selection_store(bm=None, uv_layers=None, return_selected_UV_faces=False, return_selected_faces_edges=False, return_selected_faces_loops=False):
-	if bm is None:
-		bm = bmesh.from_edit_mesh(bpy.context.active_object.data)
-		uv_layers = bm.loops.layers.uv.verify()
+	单个物体时在当前模式下直接调用；多个物体时所有选中的网格一起进入编辑模式，
+	逐个切换活动物体，结束后恢复原来的模式"""
+	context = bpy.context
+	selected_obs = [ob for ob in context.selected_objects if ob.type == 'MESH']
+	if not selected_obs:
+		return [] if need_results else None
 
-	settings.use_uv_sync = bpy.context.scene.tool_settings.use_uv_select_sync
-	settings.selection_uv_mode = bpy.context.scene.tool_settings.uv_select_mode
-
-	contextViewUV = utilities_ui.GetContextViewUV()
-	if contextViewUV:
-		settings.selection_uv_pivot = contextViewUV['area'].spaces[0].pivot_point
-		settings.selection_uv_pivot_pos = contextViewUV['area'].spaces[0].cursor_location.copy()
-
-	# Clear previous selection
-	settings.selection_vert_indexies.clear()
-	settings.selection_edge_indexies.clear()
-	settings.selection_face_indexies.clear()
-	settings.seam_edges.clear()
-
-	settings.selection_mode = tuple(bpy.context.scene.tool_settings.mesh_select_mode)
-
-	if settings.selection_mode[0]:
-		for vert in bm.verts:
-			if vert.select:
-				settings.selection_vert_indexies.add(vert.index)
-	if settings.selection_mode[1]:
-		for edge in bm.edges:
-			if edge.select:
-				settings.selection_edge_indexies.add(edge.index)
-
-	# Face selections (Loops)
-	settings.selection_uv_loops.clear()
-	if return_selected_UV_faces:
-		selected_faces = set()
-	elif return_selected_faces_edges or return_selected_faces_loops:
-		selected_faces_loops = {}
+	preactiv = context.view_layer.objects.active
 
-	for face in bm.faces:
-		if face.select:
-			settings.selection_face_indexies.add(face.index)
-		n_selected_loops = 0
-		if return_selected_faces_edges or return_selected_faces_loops:
-			face_selected_loops = []
-		
-		for loop in face.loops:
-			if loop.edge.seam == True:
-				settings.seam_edges.add(loop.edge)
-			if loop[uv_layers].select:
-				n_selected_loops += 1
-				settings.selection_uv_loops.add( (face.index, loop.vert.index) )
-				if return_selected_faces_edges or return_selected_faces_loops:
-					face_selected_loops.append(loop)
-		
-		if return_selected_UV_faces and n_selected_loops == len(face.loops) and face.select:
-			selected_faces.add(face)
-		elif return_selected_faces_edges and n_selected_loops == 2 and face.select:
-			selected_faces_loops.update({face: face_selected_loops})
-		elif return_selected_faces_loops and n_selected_loops > 0 and face.select:
-			selected_faces_loops.update({face: face_selected_loops})
-
-	if return_selected_UV_faces:
-		return selected_faces
-	elif return_selected_faces_edges or return_selected_faces_loops:
-		return selected_faces_loops
-
-
-
-def selection_restore(bm = None, uv_layers = None, restore_seams=False):
-	mode = bpy.context.object.mode
-	if mode != 'EDIT':
-		bpy.ops.object.mode_set(mode = 'EDIT')
-	if bm is None:
-		bm = bmesh.from_edit_mesh(bpy.context.active_object.data)
-		uv_layers = bm.loops.layers.uv.verify()
-
-	bpy.context.scene.tool_settings.use_uv_select_sync = settings.use_uv_sync
-	bpy.context.scene.tool_settings.uv_select_mode = settings.selection_uv_mode
+	if len(selected_obs) == 1:
+		context.view_layer.objects.active = selected_obs[0]
+		result = func(*args, **kwargs)
+		if preactiv is not None:
+			context.view_layer.objects.active = preactiv
+		if need_results:
+			return [result]
+		return None
+
+	if preactiv is None or preactiv.type != 'MESH':
+		context.view_layer.objects.active = selected_obs[0]
+	premode = context.active_object.mode
+	# 所有选中物体都要进入编辑模式：已在编辑模式但有选中物体不在其中时重新进入一次
+	if premode != 'EDIT':
+		bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+	elif any(ob.mode != 'EDIT' for ob in selected_obs):
+		bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+		bpy.ops.object.mode_set(mode='EDIT', toggle=False)
 
-	contextViewUV = utilities_ui.GetContextViewUV()
-	if contextViewUV:
-		contextViewUV['area'].spaces[0].pivot_point = settings.selection_uv_pivot
-		if settings.bversion >= 3.2:
-			with bpy.context.temp_override(**contextViewUV):
-				bpy.ops.uv.cursor_set(location=settings.selection_uv_pivot_pos)
-		else:
-			bpy.ops.uv.cursor_set(contextViewUV, location=settings.selection_uv_pivot_pos)
+	unique_selected_obs = [ob for ob in context.objects_in_mode_unique_data if ob.type == 'MESH' and ob.select_get()]
 
-	#Restore seams
-	if restore_seams:
-		bpy.ops.mesh.select_all(action='SELECT')
-		bpy.ops.mesh.mark_seam(clear=True)
-		for edge in settings.seam_edges:
-			edge.seam = True
+	def call(ob, bm):
+		context.view_layer.objects.active = ob
+		result = func(*args, **kwargs)
+		if "ob_num" in kwargs:
+			kwargs["ob_num"] += 1
+		return result
 
-	bpy.ops.mesh.select_all(action='DESELECT')
+	# 旧接口的函数自己调用 bmesh.update_edit_mesh 写回，这里不再额外刷新
+	engine = MultiObjectRun(context, unique_selected_obs)
+	results = engine.run(call, update=False)
 
-	#Selection Mode
-	bpy.context.scene.tool_settings.mesh_select_mode = settings.selection_mode
-	
-	if settings.selection_mode[0]:
-		bm.verts.ensure_lookup_table()
-		for index in settings.selection_vert_indexies:
-			if index < len(bm.verts):
-				bm.verts[index].select = True
-	if settings.selection_mode[1]:
-		bm.edges.ensure_lookup_table()
-		for index in settings.selection_edge_indexies:
-			if index < len(bm.edges):
-				bm.edges[index].select = True
-	bm.faces.ensure_lookup_table()
-	for index in settings.selection_face_indexies:
-		if index < len(bm.faces):
-			bm.faces[index].select = True
-
-	#UV Face-UV Selections (Loops)
-	if contextViewUV:
-		if settings.bversion >= 3.2:
-			with bpy.context.temp_override(**contextViewUV):
-				bpy.ops.uv.select_all(action='DESELECT')
-		else:
-			bpy.ops.uv.select_all(contextViewUV, action='DESELECT')
-	else:
-		for face in bm.faces:
-			for loop in face.loops:
-				loop[uv_layers].select = False
-	for uv_set in settings.selection_uv_loops:
-		for loop in bm.faces[uv_set[0]].loops:
-			if loop.vert.index == uv_set[1]:
-				loop[uv_layers].select = True
-				break
+	if preactiv is not None:
+		context.view_layer.objects.active = preactiv
+	if premode != 'EDIT':
+		bpy.ops.object.mode_set(mode=premode)
 
-	# Workaround for selection not flushing properly from loops in EDGE or FACE UV Selection Mode, apparently since UV edge selection support was added to the UV space
-	if settings.selection_uv_mode != "VERTEX":
-		bpy.ops.uv.select_mode(type='VERTEX')
-	bpy.context.scene.tool_settings.uv_select_mode = settings.selection_uv_mode
+	if need_results :
+		return list(results.values())
 
-	bpy.context.view_layer.update()
-	bpy.ops.object.mode_set(mode=mode)
 
 
 def selected_unique_objects_in_mode_with_uv():
@@ -268,39 +174,27 @@ def move_island(island, dx, dy):
 	uv_layer = bm.loops.layers.uv.verify()
 
 	# adjust uv coordinates
-	for face in island:
-		for loop in face.loops:
-			loop_uv = loop[uv_layer]
-			loop_uv.uv[0] += dx
-			loop_uv.uv[1] += dy
+	utils_transform.transform_islands([island], uv_layer, utils_transform.translation(dx, dy))
 	
 	bmesh.update_edit_mesh(me)
 
 
 def translate_island(island, uv_layer, delta):
-	for face in island:
-		for loop in face.loops:
-			loop[uv_layer].uv += delta
+	utils_transform.transform_islands([island], uv_layer, utils_transform.translation(delta[0], delta[1]))
 
 
 def rotate_island(island, uv_layer=None, angle=0, pivot=None):
 	'''Rotate a list of faces by angle (in radians) around a center'''
-	rot_matrix = mathutils.Matrix.Rotation(-angle, 2)
 	if uv_layer is None:
 		me = bpy.context.active_object.data
 		bm = bmesh.from_edit_mesh(me)
 		uv_layer = bm.loops.layers.uv.verify()
+	# 与旧实现保持一致：有 pivot 时顺时针绕 pivot 旋转，否则逆时针绕原点旋转
 	if pivot:
-		for face in island:
-			for loop in face.loops:
-				uv = loop[uv_layer]
-				uv.uv = rot_matrix @ (uv.uv - pivot) + pivot
-		return
-
-	for face in island:
-		for loop in face.loops:
-			uv = loop[uv_layer]
-			uv.uv = uv.uv @ rot_matrix
+		matrix = utils_transform.rotation(-angle, pivot)
+	else:
+		matrix = utils_transform.rotation(angle)
+	utils_transform.transform_islands([island], uv_layer, matrix)
 
 
 def scale_island(island, uv_layer, scale_x, scale_y, pivot=None):
@@ -310,15 +204,7 @@ def scale_island(island, uv_layer, scale_x, scale_y, pivot=None):
 		bbox = get_BBOX(island, None, uv_layer)
 		pivot = bbox['center']
 	
-	for face in island:
-		for loop in face.loops:
-			x, y = loop[uv_layer].uv               
-			xt = x - pivot.x
-			yt = y - pivot.y
-			xs = xt * scale_x
-			ys = yt * scale_y
-			loop[uv_layer].uv.x = xs + pivot.x
-			loop[uv_layer].uv.y = ys + pivot.y
+	utils_transform.transform_islands([island], uv_layer, utils_transform.scaling(scale_x, scale_y, pivot))
 
 
 def set_selected_faces(faces, bm, uv_layers):
@@ -544,104 +430,74 @@ def get_center(group, bm, uv_layers, are_loops=False):
 
 
 
-def get_selected_islands(bm, uv_layers, selected=True, extend_selection_to_islands=False):
-	islands = []
-	island = set()
-
+def get_selected_islands(bm, uv_layers, selected=True, extend_selection_to_islands=False, mesh=None):
 	sync = bpy.context.scene.tool_settings.use_uv_select_sync
 
-	faces = bm.faces
-	# Reset tags for unselected (if tag is False - skip)
+	# 参与分岛的面（与原先的 face.tag 规则一致）
 	if selected:
 		if sync:
-			for face in faces:
-				face.tag = face.select
+			faces = [f for f in bm.faces if f.select]
 		else:
-			for face in faces:
-				if face.select:
-					face.tag = all(l[uv_layers].select for l in face.loops)
-					continue
-				face.tag = False
+			faces = [f for f in bm.faces if f.select and all(l[uv_layers].select for l in f.loops)]
 	else:
 		if sync:
-			for face in faces:
-				face.tag = not face.hide
+			faces = [f for f in bm.faces if not f.hide]
 		else:
-			for face in faces:
-				face.tag = not face.hide and face.select
+			faces = [f for f in bm.faces if not f.hide and f.select]
 
-	for face in faces:
-		# Skip unselected and appended faces
-		if not face.tag:  # if is False:
-			continue
-
-		# Tag first element in island (dont add again)
-		face.tag = False
-
-		# Container collector of island elements
-		parts_of_island = [face]
-
-		# Container for get elements from loop from parts_of_island
-		temp = []
-
-		# Blank list == all faces of the island taken
-		while parts_of_island:
-			for f in parts_of_island:
-				# Running through all the neighboring faces
-				for l in f.loops:
-					link_face = l.link_loop_radial_next.face
-					# Skip appended
-					if not link_face.tag:  # if is False:
-						continue
-
-					for ll in link_face.loops:
-						if not ll.face.tag:  # if is False:
-							continue
-						# If the coordinates of the vertices of adjacent
-						# faces on the uv match, then this is part of the
-						# island and we append face to the list
-						if ll[uv_layers].uv != l[uv_layers].uv:
-							continue
-						# Skip non-manifold
-						if (l.link_loop_next[uv_layers].uv == ll.link_loop_prev[uv_layers].uv) or \
-								(ll.link_loop_next[uv_layers].uv == l.link_loop_prev[uv_layers].uv):
-							temp.append(ll.face)
-							ll.face.tag = False
-
-			island.update(parts_of_island)
-			parts_of_island = temp
-			temp = []
-
-		# Skip the islands that don't have a single selected face.
-		if selected is False and extend_selection_to_islands is True:
-			if sync:
-				for face in island:
-					if face.select:
-						break
-				else:
-					island = set()
-					continue
-			else:
-				for face in island:
-					if all(l[uv_layers].select for l in face.loops):
-						break
-				else:
-					island = set()
-					continue
+	islands = [set(island) for island in utils_island.calc_islands(bm, uv_layers, faces, mesh)]
+
+	# Skip the islands that don't have a single selected face.
+	if selected is False and extend_selection_to_islands is True:
+		if sync:
+			islands = [island for island in islands if any(f.select for f in island)]
+		else:
+			islands = [island for island in islands if any(all(l[uv_layers].select for l in f.loops) for f in island)]
 
-		islands.append(island)
-		island = set()
 	return islands
 
 
-def getFacesIslands(bm, uv_layers, faces, islands, disordered_island_faces):
+def _uv_visible_faces(bm):
+	"""UV编辑器中可见的面（非同步模式下只显示选中的面）"""
+	if bpy.context.scene.tool_settings.use_uv_select_sync:
+		return [f for f in bm.faces if not f.hide]
+	return [f for f in bm.faces if f.select]
+
+
+
+def _island_groups(island_of, faces):
+	"""把faces按岛编号分组，不可见的面各自成组"""
+	groups = {}
 	for face in faces:
-		if face in disordered_island_faces:
-			bpy.ops.uv.select_all(action='DESELECT')
-			face.loops[0][uv_layers].select = True
-			bpy.ops.uv.select_linked()
+		label = island_of[face.index]
+		key = label if label >= 0 else ('face', face.index)
+		groups.setdefault(key, set()).add(face)
+	return groups
+
+
+
+def _linked_faces(island_of, groups, seed_faces):
+	"""返回与seed_faces处于同一岛的全部面，相当于select_linked"""
+	linked = set()
+	for face in seed_faces:
+		label = island_of[face.index]
+		if label >= 0:
+			linked.update(groups.get(label, ()))
+		else:
+			linked.add(face)
+	return linked
 
-			islandFaces = {f for f in disordered_island_faces if f.loops[0][uv_layers].select}
+
+
+def getFacesIslands(bm, uv_layers, faces, islands, disordered_island_faces, island_of=None, mesh=None):
+	if island_of is None:
+		island_of = utils_island.face_island_indices(bm, uv_layers, _uv_visible_faces(bm), mesh)
+	groups = _island_groups(island_of, disordered_island_faces)
+
+	for face in faces:
+		if face in disordered_island_faces:
+			label = island_of[face.index]
+			islandFaces = groups.pop(label if label >= 0 else ('face', face.index))
 			disordered_island_faces.difference_update(islandFaces)
 
 			islands.append(islandFaces)
@@ -650,7 +506,7 @@ def getFacesIslands(bm, uv_layers, faces, islands, disordered_island_faces):
 
 
 
-def getAllIslands(bm, uv_layers):
+def getAllIslands(bm, uv_layers, mesh=None):
 	faces = {f for f in bm.faces if f.select}
 	if not faces:
 		return []
@@ -658,13 +514,14 @@ def getAllIslands(bm, uv_layers):
 	islands = []
 	faces_unparsed = faces.copy()
 
-	getFacesIslands(bm, uv_layers, faces, islands, faces_unparsed)
+	getFacesIslands(bm, uv_layers, faces, islands, faces_unparsed, mesh=mesh)
 
 	return islands
 
 
 
-def getSelectionIslands(bm, uv_layers, extend_selection_to_islands=False, selected_faces=None, need_faces_selected=True, restore_selected=True):
+def getSelectionIslands(bm, uv_layers, extend_selection_to_islands=False, selected_faces=None, need_faces_selected=True, restore_selected=True, mesh=None):
+	# 不再通过操作符修改选择，restore_selected 仅为兼容旧调用保留
 	if selected_faces is None:
 		if need_faces_selected:
 			selected_faces = {f for f in bm.faces if all([l[uv_layers].select for l in f.loops]) and f.select}
@@ -673,37 +530,37 @@ def getSelectionIslands(bm, uv_layers, extend_selection_to_islands=False, select
 	if not selected_faces:
 		return []
 
+	visible_faces = _uv_visible_faces(bm)
+	island_of = utils_island.face_island_indices(bm, uv_layers, visible_faces, mesh)
+
 	# Select islands
 	if extend_selection_to_islands:
-		bpy.ops.uv.select_linked()
-		disordered_island_faces = {f for f in bm.faces if f.loops[0][uv_layers].select and f.select}
+		disordered_island_faces = _linked_faces(island_of, _island_groups(island_of, visible_faces), selected_faces)
 	else:
 		disordered_island_faces = selected_faces.copy()
 
 	# Collect UV islands
 	islands = []
 
-	getFacesIslands(bm, uv_layers, selected_faces, islands, disordered_island_faces)
+	getFacesIslands(bm, uv_layers, selected_faces, islands, disordered_island_faces, island_of)
 
-	# Restore selection
-	if restore_selected:
-		bpy.ops.uv.select_all(action='DESELECT')
-		set_selected_faces(selected_faces, bm, uv_layers)
-	
 	return islands
 
 
 
-def getSelectedUnselectedIslands(bm, uv_layers, selected_faces=None, target_faces=None, restore_selected=False):
+def getSelectedUnselectedIslands(bm, uv_layers, selected_faces=None, target_faces=None, restore_selected=False, mesh=None):
 	if selected_faces is None:
 		return [], []
 
+	visible_faces = _uv_visible_faces(bm)
+	island_of = utils_island.face_island_indices(bm, uv_layers, visible_faces, mesh)
+	all_groups = _island_groups(island_of, visible_faces)
+
 	# Collect selected UV islands
 	selected_islands = []
-	bpy.ops.uv.select_linked()
-	disordered_islands_selected = {f for f in bm.faces if f.loops[0][uv_layers].select and f.select}
+	disordered_islands_selected = _linked_faces(island_of, all_groups, selected_faces)
 
-	getFacesIslands(bm, uv_layers, selected_faces, selected_islands, disordered_islands_selected)
+	getFacesIslands(bm, uv_layers, selected_faces, selected_islands, disordered_islands_selected, island_of)
 
 	# Collect target UV islands
 	if target_faces is None:
@@ -711,26 +568,22 @@ def getSelectedUnselectedIslands(bm, uv_layers, selected_faces=None, target_face
 
 	target_islands = []
 	target_faces.difference_update(disordered_islands_selected)
-	bpy.ops.uv.select_all(action='DESELECT')
-	for f in target_faces:
-		f.loops[0][uv_layers].select = True
-	bpy.ops.uv.select_linked()
-	disordered_islands_targets = {f for f in bm.faces if f.loops[0][uv_layers].select and f.select}
-
-	getFacesIslands(bm, uv_layers, target_faces, target_islands, disordered_islands_targets)
+	disordered_islands_targets = _linked_faces(island_of, all_groups, target_faces)
 
-	if restore_selected:
-		bpy.ops.uv.select_all(action='DESELECT')
-		set_selected_faces(selected_faces, bm, uv_layers)
+	getFacesIslands(bm, uv_layers, target_faces, target_islands, disordered_islands_targets, island_of)
 
 	return selected_islands, target_islands
 
 
 
-def getSelectionFacesIslands(bm, uv_layers, selected_faces_loops):
+def getSelectionFacesIslands(bm, uv_layers, selected_faces_loops, mesh=None):
+	visible_faces = _uv_visible_faces(bm)
+	island_of = utils_island.face_island_indices(bm, uv_layers, visible_faces, mesh)
+	groups = _island_groups(island_of, visible_faces)
+
 	# Select islands
-	bpy.ops.uv.select_linked()
-	disordered_island_faces = {f for f in bm.faces if f.loops[0][uv_layers].select and f.select}
+	seed_faces = [f for f in visible_faces if any(l[uv_layers].select for l in f.loops)]
+	disordered_island_faces = _linked_faces(island_of, groups, seed_faces)
 
 	# Collect UV islands
 	selected_faces_islands = {}
@@ -740,11 +593,7 @@ def getSelectionFacesIslands(bm, uv_layers, selected_faces_loops):
 		if face not in disordered_island_faces:
 			to_remove.add(face)
 		else:
-			bpy.ops.uv.select_all(action='DESELECT')
-			face.loops[0][uv_layers].select = True
-			bpy.ops.uv.select_linked()
-
-			face_island = {f for f in disordered_island_faces if f.loops[0][uv_layers].select}
+			face_island = _linked_faces(island_of, groups, (face,)) & disordered_island_faces
 			disordered_island_faces.difference_update(face_island)
 
 			selected_faces_islands.update({face: face_island})
@@ -792,43 +641,10 @@ def find_min_rotate_angle(angle):
 	return math.radians(angle)
 
 def calc_min_align_angle(selected_faces, uv_layers):
-	points = [l[uv_layers].uv for f in selected_faces for l in f.loops]
-	align_angle_pre = mathutils.geometry.box_fit_2d(points)
-	return find_min_rotate_angle(align_angle_pre)
+	points = [c for f in selected_faces for l in f.loops for c in l[uv_layers].uv]
+	return calc_min_align_angle_pt(points)
 
 def calc_min_align_angle_pt(points):
-	align_angle_pre = mathutils.geometry.box_fit_2d(points)
+	# 只把凸包顶点交给 box_fit_2d，结果按岛内容缓存
+	align_angle_pre = utils_hull.box_fit_angle(np.asarray(points, dtype=np.float64).reshape(-1, 2))
 	return find_min_rotate_angle(align_angle_pre)
-
-def get_uv_island(bm, uv_layer, start_face):
-	"""获取包含给定面的UV岛"""
-	island = set()
-	faces_to_process = {start_face}
-	
-	while faces_to_process:
-		face = faces_to_process.pop()
-		if face not in island:
-			island.add(face)
-			
-			# 获取这个面的所有UV边界
-			face_edges = set()
-			for loop in face.loops:
-				uv = loop[uv_layer].uv.copy().freeze()
-				next_uv = loop.link_loop_next[uv_layer].uv.copy().freeze()
-				face_edges.add((uv, next_uv))
-			
-			# 检查所有其他面，看是否共享UV边
-			for other_face in bm.faces:
-				if other_face != face and other_face not in island:
-					other_edges = set()
-					for loop in other_face.loops:
-						uv = loop[uv_layer].uv.copy().freeze()
-						next_uv = loop.link_loop_next[uv_layer].uv.copy().freeze()
-						other_edges.add((uv, next_uv))
-						other_edges.add((next_uv, uv))  # 添加反向边
-					
-					# 如果有共享的UV边，将这个面添加到待处理列表
-					if face_edges & other_edges:
-						faces_to_process.add(other_face)
-	
-	return list(island)